@@ -0,0 +1,209 @@
+"""Local aiohttp stand-ins for the APIs the pollers talk to.
+
+One server answers for Warcraft Logs (v1 and the v2 GraphQL endpoint), Raider.IO, Reddit's OAuth API
+and Discord's REST API, on separate path prefixes. Every response is delayed by ``latency`` seconds
+and a fraction ``error_rate`` of upstream API requests fail with a 503 (Discord requests never do).
+:meth:`FakeUpstream.advance` publishes new reports, submissions and comments on a random
+``new_item_rate`` share of sources, so announcements flow through the same code as in production.
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+
+from aiohttp import web
+
+_ALIAS = re.compile(r'(s\d+): reportData \{ reports\(guildName: "([^"]+)"')
+_ids = itertools.count(1)
+
+
+class FakeUpstream:
+    def __init__(
+            self,
+            latency: float = 0.05,
+            error_rate: float = 0.0,
+            reports_per_source: int = 5,
+            padding_bytes: int = 0,
+            new_item_rate: float = 0.1,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.reports_per_source = reports_per_source
+        self.padding = "x" * padding_bytes
+        self.new_item_rate = new_item_rate
+        self.reports: dict[str, list[dict]] = {}
+        self.reddit_items: dict[tuple[str, str], list[dict]] = {}
+        self.requests = 0
+        self.discord_messages = 0
+        self.discord_embeds = 0
+        self.app = web.Application()
+        self.app.router.add_get("/v1/reports/guild/{name}/{server}/{region}", self.wcl_v1_reports)
+        self.app.router.add_post("/oauth/token", self.token)
+        self.app.router.add_post("/api/v2/client", self.wcl_v2_graphql)
+        self.app.router.add_get("/api/v1/guilds/profile", self.raiderio_profile)
+        self.app.router.add_post("/api/v1/access_token", self.token)
+        self.app.router.add_get("/user/{name}/{kind}", self.reddit_listing)
+        self.app.router.add_post("/api/v10/channels/{channel_id}/messages", self.discord_create_message)
+        self.app.router.add_patch("/api/v10/channels/{channel_id}/messages/{message_id}", self.discord_edit_message)
+        self._runner = None
+        self.url = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def advance(self) -> None:
+        """Publish new items for a random share of the known sources."""
+        now = int(time.time() * 1000)
+        for name, reports in self.reports.items():
+            if random.random() < self.new_item_rate:
+                reports.insert(0, self._report(name, now))
+                del reports[self.reports_per_source:]
+        for (user, kind), items in self.reddit_items.items():
+            if random.random() < self.new_item_rate:
+                items.insert(0, self._reddit_item(user, kind, now / 1000))
+                del items[self.reports_per_source:]
+
+    def _report(self, name: str, start_ms: int) -> dict:
+        return {
+            "id": f"r{next(_ids)}",
+            "title": f"{name} raid night {self.padding}",
+            "owner": name,
+            "start": start_ms,
+            "end": start_ms + 3_600_000,
+        }
+
+    def _reddit_item(self, user: str, kind: str, created: float) -> dict:
+        item_id = f"{next(_ids):x}"
+        data = {
+            "id": item_id,
+            "name": f"{'t3' if kind == 'submitted' else 't1'}_{item_id}",
+            "author": user,
+            "created_utc": created,
+            "permalink": f"/r/bench/comments/{item_id}/",
+            "subreddit": "bench",
+            "subreddit_id": "t5_bench",
+        }
+        if kind == "submitted":
+            data.update(title=f"Post by {user} {self.padding}", url=f"https://example.com/{item_id}")
+            return {"kind": "t3", "data": data}
+        data.update(body=f"Comment by {user} {self.padding}", link_id="t3_bench")
+        return {"kind": "t1", "data": data}
+
+    async def _delay_or_fail(self, can_fail: bool = True) -> None:
+        if can_fail:
+            self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if can_fail and self.error_rate and random.random() < self.error_rate:
+            raise web.HTTPServiceUnavailable()
+
+    def _reports_for(self, name: str) -> list[dict]:
+        if name not in self.reports:
+            start = int(time.time() * 1000) - 86_400_000
+            self.reports[name] = [self._report(name, start - i * 60_000) for i in range(self.reports_per_source)]
+        return self.reports[name]
+
+    async def wcl_v1_reports(self, request: web.Request) -> web.Response:
+        await self._delay_or_fail()
+        body = json.dumps(self._reports_for(request.match_info["name"])).encode()
+        etag = f'"{hash(body) & 0xffffffff:x}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    async def token(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"access_token": "benchmark", "token_type": "bearer", "expires_in": 3600, "scope": "*"}
+        )
+
+    async def wcl_v2_graphql(self, request: web.Request) -> web.Response:
+        await self._delay_or_fail()
+        query = (await request.json())["query"]
+        data = {}
+        for alias, name in _ALIAS.findall(query):
+            data[alias] = {"reports": {"data": [
+                {
+                    "code": report["id"],
+                    "title": report["title"],
+                    "startTime": report["start"],
+                    "endTime": report["end"],
+                    "owner": {"name": report["owner"]},
+                }
+                for report in self._reports_for(name)
+            ]}}
+        return web.json_response({"data": data})
+
+    async def raiderio_profile(self, request: web.Request) -> web.Response:
+        await self._delay_or_fail()
+        slug = "manaforge-omega"
+        rank = random.randint(1, 5000)
+        return web.json_response({
+            "name": request.query.get("name"),
+            "raid_progression": {slug: {"summary": f"{random.randint(0, 8)}/8 M {self.padding}"}},
+            "raid_rankings": {slug: {
+                "mythic": {"world": rank},
+                "heroic": {"world": rank * 2},
+                "normal": {"world": rank * 3},
+            }},
+        })
+
+    async def reddit_listing(self, request: web.Request) -> web.Response:
+        await self._delay_or_fail()
+        user, kind = request.match_info["name"], request.match_info["kind"]
+        key = (user, kind)
+        if key not in self.reddit_items:
+            created = time.time() - 86_400
+            self.reddit_items[key] = [
+                self._reddit_item(user, kind, created - i * 60) for i in range(self.reports_per_source)
+            ]
+        limit = int(request.query.get("limit", 100))
+        children = self.reddit_items[key][:limit]
+        return web.json_response({"kind": "Listing", "data": {"children": children, "after": None, "before": None}})
+
+    async def discord_create_message(self, request: web.Request) -> web.Response:
+        await self._delay_or_fail(can_fail=False)
+        payload = await request.json()
+        self.discord_messages += 1
+        self.discord_embeds += len(payload.get("embeds", ()))
+        return web.json_response(self._message(request.match_info["channel_id"], str(next(_ids)), payload))
+
+    async def discord_edit_message(self, request: web.Request) -> web.Response:
+        await self._delay_or_fail(can_fail=False)
+        payload = await request.json()
+        self.discord_messages += 1
+        self.discord_embeds += len(payload.get("embeds", ()))
+        return web.json_response(
+            self._message(request.match_info["channel_id"], request.match_info["message_id"], payload)
+        )
+
+    @staticmethod
+    def _message(channel_id: str, message_id: str, payload: dict) -> dict:
+        return {
+            "id": message_id,
+            "channel_id": channel_id,
+            "author": {"id": "1", "username": "bench", "discriminator": "0", "avatar": None},
+            "content": "",
+            "timestamp": "2024-01-01T00:00:00+00:00",
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": payload.get("embeds", []),
+            "pinned": False,
+            "type": 0,
+            "flags": 0,
+        }
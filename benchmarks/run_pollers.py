@@ -0,0 +1,240 @@
+"""Drive the real pollers against local fake APIs and report throughput.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run_pollers --sources 10,100,1000 --ticks 20 --latency-ms 50
+
+Every tick publishes new items on the fake server, then runs one poll of each selected poller over
+all synthetic sources. Announcements go through MessageDispatcher and hikari's REST client into the
+fake Discord endpoint, and dedup state goes to a throwaway SQLite database.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import asyncpraw
+import hikari
+
+from benchmarks.fake_servers import FakeUpstream
+from services.config import config_service
+
+POLLERS = ("warcraftlogs", "reddit", "guild_ranks")
+
+
+def synthetic_config(url: str, sources: int, api: str, workdir: str, rank_groups: int = 1) -> dict:
+    guild_rank_group = {
+        "guilds": [{"name": f"guild{i}", "region": "eu", "realm": "Bench Realm"} for i in range(sources)],
+        "channel_key": "bench",
+        "concurrency_limit": 10,
+        "message_filename": os.path.join(workdir, "guild_rank_message.json"),
+    }
+    return {
+        "channel_ids": {"bench": 100000000000000000},
+        "warcraft_logs_api": api,
+        "log_check_concurrency": 50,
+        "log_sources": {
+            f"guild{i}": {
+                "url": f"{url}/v1/reports/guild/guild{i}/Bench-Realm/eu",
+                "color": "#ff7f00",
+                "filename": f"bench_{i}.txt",
+                "cron_schedule": "* * * * *",
+                "channels": ["bench"],
+            }
+            for i in range(sources)
+        },
+        "reddit_sources": {
+            f"user{i}": {
+                "username": f"user{i}",
+                "channels": ["bench"],
+                "color": "#ff4500",
+                "filename": f"reddit/user{i}.txt",
+                "cron_schedule": "* * * * *",
+            }
+            for i in range(sources)
+        },
+        "guild_rank_group": guild_rank_group,
+        # extra groups list the same guilds, so they should cost no extra Raider.IO requests
+        "guild_rank_groups": {f"group{j}": guild_rank_group for j in range(1, rank_groups)},
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run_case(args, sources: int) -> dict:
+    upstream = FakeUpstream(
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        reports_per_source=args.items_per_source,
+        padding_bytes=args.padding_bytes,
+        new_item_rate=args.new_item_rate,
+    )
+    url = await upstream.start()
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    config_path = os.path.join(workdir, "config.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(synthetic_config(url, sources, args.api, workdir, args.rank_groups), f)
+    config_service.path = config_path
+    await config_service.check_for_changes()
+    os.environ.setdefault("WARCRAFT_LOGS_TOKEN", "benchmark")
+    os.environ.setdefault("RAIDERIO_TOKEN", "benchmark")
+    os.environ.setdefault("WARCRAFT_LOGS_CLIENT_ID", "benchmark")
+    os.environ.setdefault("WARCRAFT_LOGS_CLIENT_SECRET", "benchmark")
+
+    # imported here so that module-level config reads see the synthetic config
+    from commands import guild_ranks, reddit_tracker, warcraftlogs
+    from services import raiderio, resilience, warcraftlogs_api
+    from services.db import Database
+    from services.dispatcher import MessageDispatcher
+    from services.http import close_http_session, create_http_session
+    from services.ratelimit import TokenBucket
+    from services.state import StateStore
+    from utils import get_config
+
+    warcraftlogs_api.TOKEN_URL = f"{url}/oauth/token"
+    warcraftlogs_api.GRAPHQL_URL = f"{url}/api/v2/client"
+    raiderio.RAIDERIO_API_URL = f"{url}/api/v1"
+    # every case starts with closed circuits and no state left over from the previous one
+    resilience._breakers.clear()
+    warcraftlogs._validators.clear()
+    warcraftlogs._v2_client = None
+    guild_ranks._leaderboards.clear()
+    guild_ranks._snapshots.clear()
+    guild_ranks._messages.clear()
+
+    session = create_http_session()
+    database = Database(os.path.join(workdir, "bench.sqlite3"))
+    await database.open()
+    state = StateStore(database)
+    rest_app = hikari.RESTApp(url=f"{url}/api/v10")
+    await rest_app.start()
+    rest = rest_app.acquire("benchmark", hikari.TokenType.BOT)
+    rest.start()
+    dispatcher = MessageDispatcher(rest)
+
+    config = get_config()
+    warcraftlogs._sources.clear()
+    warcraftlogs._sources.update(warcraftlogs.compile_log_sources(config))
+    warcraftlogs.setup_v2_client(session, config)
+    reddit_tracker._sources.clear()
+    reddit_tracker._sources.update(reddit_tracker.compile_reddit_sources(config))
+    reddit_tracker.reddit = asyncpraw.Reddit(
+        client_id="benchmark", client_secret="benchmark", user_agent="benchmark",
+        oauth_url=url, reddit_url=url,
+    )
+    reddit_tracker.request_bucket = TokenBucket(args.reddit_rate, args.reddit_rate)
+    guild_ranks._client = raiderio.RaiderIOClient(
+        session, "benchmark", config["guild_rank_group"]["concurrency_limit"]
+    )
+    guild_ranks._client.bucket = TokenBucket(args.raiderio_rate, args.raiderio_rate)
+
+    async def tick():
+        jobs = []
+        if "warcraftlogs" in args.pollers:
+            jobs.append(warcraftlogs.poll_sources(dispatcher, session, state, list(warcraftlogs._sources)))
+        if "reddit" in args.pollers:
+            jobs.append(reddit_tracker.poll_reddit_sources(dispatcher, state, list(reddit_tracker._sources)))
+        if "guild_ranks" in args.pollers:
+            jobs.append(guild_ranks.check_guild_ranks(rest, state))
+        await asyncio.gather(*jobs)
+        await state.flush()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    try:
+        # the first tick announces every source's newest item once; it isn't part of the steady state
+        await tick()
+        messages_before = upstream.discord_messages
+        requests_before = upstream.requests
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.ticks):
+            upstream.advance()
+            tick_start = time.perf_counter()
+            await tick()
+            latencies.append(time.perf_counter() - tick_start)
+        elapsed = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+    finally:
+        if args.tracemalloc:
+            tracemalloc.stop()
+        await dispatcher.close()
+        await reddit_tracker.reddit.close()
+        await rest.close()
+        await rest_app.close()
+        await close_http_session(session)
+        await database.close()
+        await upstream.stop()
+
+    return {
+        "sources": sources,
+        "ticks_per_second": args.ticks / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "discord_messages_per_second": (upstream.discord_messages - messages_before) / elapsed,
+        "upstream_requests": upstream.requests - requests_before,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "traced_peak_mb": traced_peak / 2 ** 20 if traced_peak is not None else None,
+    }
+
+
+def print_results(results):
+    header = f"{'sources':>8} {'ticks/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'msgs/s':>9} {'requests':>9} {'rss MB':>8} {'traced MB':>10}"
+    print(header)
+    for r in results:
+        traced = f"{r['traced_peak_mb']:.1f}" if r["traced_peak_mb"] is not None else "-"
+        print(
+            f"{r['sources']:>8} {r['ticks_per_second']:>9.2f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+            f"{r['discord_messages_per_second']:>9.1f} {r['upstream_requests']:>9} {r['max_rss_mb']:>8.1f} {traced:>10}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sources", default="10,100,1000", help="comma-separated source counts, 10 to 10000")
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--pollers", default=",".join(POLLERS), help=f"any of {', '.join(POLLERS)}")
+    parser.add_argument("--api", choices=("v1", "v2"), default="v1", help="Warcraft Logs API to poll")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--items-per-source", type=int, default=5)
+    parser.add_argument("--padding-bytes", type=int, default=0, help="extra bytes in every title/body")
+    parser.add_argument("--new-item-rate", type=float, default=0.1, help="share of sources with new items per tick")
+    parser.add_argument("--reddit-rate", type=float, default=1000, help="Reddit request budget per second")
+    parser.add_argument("--raiderio-rate", type=float, default=1000, help="Raider.IO request budget per second")
+    parser.add_argument("--rank-groups", type=int, default=1, help="guild rank groups sharing the same guilds")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the traced Python heap peak")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+    args.pollers = {name.strip() for name in args.pollers.split(",") if name.strip()}
+    unknown = args.pollers - set(POLLERS)
+    if unknown:
+        parser.error(f"unknown pollers: {', '.join(sorted(unknown))}")
+    return args
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    results = []
+    for count in (int(n) for n in args.sources.split(",")):
+        results.append(await run_case(args, count))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,15 +1,37 @@
+import asyncio
+import logging
+
+import aiohttp
 import hikari
 import lightbulb
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from utils import get_discord_token
+from apscheduler.triggers.interval import IntervalTrigger
+from utils import get_discord_token, get_config
 from commands import setup
+from services.http import create_http_session, close_http_session
+from services.config import ConfigService, config_service, WATCH_INTERVAL_SECONDS
+from services.db import Database
+from services.dispatcher import MessageDispatcher
+from services.lichess import LichessClient
+from services import log as logging_setup
+from services.metrics import (
+    DEFAULT_METRICS_HOST, DEFAULT_METRICS_PORT, instrument_scheduler, monitor_event_loop_lag,
+    start_metrics_server, stop_metrics_server,
+)
+from services.state import StateStore, FLUSH_INTERVAL_SECONDS
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Set up before hikari so its loggers go through the same queue
+logging_setup.setup_logging(get_config())
+config_service.subscribe(logging_setup.on_config_reloaded)
+log = logging.getLogger("bot")
+
 bot = hikari.GatewayBot(
     token=get_discord_token(),
     intents=hikari.Intents.ALL,
+    logs=None,
 )
 
 client = lightbulb.client_from_app(
@@ -24,13 +46,70 @@ client.di.registry_for(lightbulb.di.Contexts.DEFAULT).register_value(
     AsyncIOScheduler, sched
 )
 
+database = Database()
+client.di.registry_for(lightbulb.di.Contexts.DEFAULT).register_value(ConfigService, config_service)
+
+state = StateStore(database)
+client.di.registry_for(lightbulb.di.Contexts.DEFAULT).register_value(StateStore, state)
+
+dispatcher = MessageDispatcher(bot.rest)
+client.di.registry_for(lightbulb.di.Contexts.DEFAULT).register_value(MessageDispatcher, dispatcher)
+
+
+http_session: aiohttp.ClientSession | None = None
+metrics_runner = None
+loop_lag_task: asyncio.Task | None = None
+
 
 @bot.listen(hikari.StartingEvent)
 async def on_starting(event: hikari.StartingEvent) -> None:
+    global http_session, metrics_runner, loop_lag_task
+    instrument_scheduler(sched)
     sched.start()
-    print("APScheduler started")
+    log.info("APScheduler started")
+    metrics_config = get_config().get("metrics", {})
+    if metrics_config.get("enabled", True):
+        host = metrics_config.get("host", DEFAULT_METRICS_HOST)
+        port = metrics_config.get("port", DEFAULT_METRICS_PORT)
+        try:
+            metrics_runner = await start_metrics_server(host, port)
+            log.info("Metrics served on http://%s:%s/metrics", host, port)
+        except OSError as e:
+            # a taken port must not keep the extensions below from loading
+            log.error("Could not serve metrics on %s:%s, continuing without them: %s", host, port, e)
+    loop_lag_task = asyncio.create_task(monitor_event_loop_lag())
+    await database.open()
+    sched.add_job(state.flush, IntervalTrigger(seconds=FLUSH_INTERVAL_SECONDS), id="state_flush", replace_existing=True)
+    sched.add_job(
+        config_service.check_for_changes,
+        IntervalTrigger(seconds=WATCH_INTERVAL_SECONDS),
+        id="config_watch",
+        replace_existing=True,
+    )
+    # The session has to be created inside the running loop, so it is registered here rather than at import
+    http_session = create_http_session()
+    client.di.registry_for(lightbulb.di.Contexts.DEFAULT).register_value(aiohttp.ClientSession, http_session)
+    client.di.registry_for(lightbulb.di.Contexts.DEFAULT).register_value(LichessClient, LichessClient(http_session))
+    log.info("HTTP session created")
     await setup(client)  # load extensions first
     await client.start(event)  # then start the client so it syncs with commands already loaded
 
 
+@bot.listen(hikari.StoppingEvent)
+async def on_stopping(event: hikari.StoppingEvent) -> None:
+    if sched.running:
+        sched.shutdown(wait=False)
+    if loop_lag_task is not None:
+        loop_lag_task.cancel()
+    if metrics_runner is not None:
+        await stop_metrics_server(metrics_runner)
+    await dispatcher.close()
+    await state.flush()
+    await database.close()
+    if http_session is not None:
+        await close_http_session(http_session)
+        log.info("HTTP session closed")
+    logging_setup.stop_logging()
+
+
 bot.run()
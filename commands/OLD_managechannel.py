@@ -2,7 +2,7 @@ from typing import Union, Sequence
 import hikari
 import lightbulb
 import json
-from utils import read_json_file
+from utils import read_json_file, get_config
 
 
 def manage_channel_command(bot):
@@ -69,7 +69,7 @@ def manage_channel_command(bot):
     ) -> Union[
         str, Sequence[str], hikari.api.AutocompleteChoiceBuilder, Sequence[hikari.api.AutocompleteChoiceBuilder]]:
 
-        config = read_json_file('config.json')
+        config = get_config()
         channel_ids = config['channel_ids']
 
         # Find matches based on user input
@@ -2,7 +2,7 @@ from typing import Union, Sequence
 import hikari
 import lightbulb
 import json
-from utils import read_json_file
+from utils import read_json_file, get_config
 import random
 from .warcraftlogs import initialize_log_checks
 
@@ -130,7 +130,7 @@ def manage_logs_command(bot):
             inter: hikari.AutocompleteInteraction
     ) -> Union[
         str, Sequence[str], hikari.api.AutocompleteChoiceBuilder, Sequence[hikari.api.AutocompleteChoiceBuilder]]:
-        config = read_json_file('config.json')
+        config = get_config()
         log_sources = config['log_sources']
 
         # Find matches based on user input
@@ -159,7 +159,7 @@ def manage_logs_command(bot):
             inter: hikari.AutocompleteInteraction
     ) -> Union[
         str, Sequence[str], hikari.api.AutocompleteChoiceBuilder, Sequence[hikari.api.AutocompleteChoiceBuilder]]:
-        config = read_json_file('config.json')
+        config = get_config()
         channel_ids = config.get('channel_ids', {})
         channel_names = list(channel_ids.keys())
 
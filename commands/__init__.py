@@ -9,4 +9,6 @@ async def setup(client: lightbulb.Client) -> None:
         "commands.chesstv",
         "commands.warcraftlogs",
         "commands.reddit_tracker",
+        "commands.guild_ranks",
+        "commands.perf",
     )
@@ -0,0 +1,382 @@
+import asyncio
+import functools
+import logging
+import time
+from datetime import datetime, timezone
+from operator import attrgetter
+from urllib.parse import quote
+
+import aiohttp
+import hikari
+import lightbulb
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from utils import get_config, get_raiderio_token
+from services.config import config_service
+from services.leaderboard import Leaderboard, content_hash
+from services.profiling import profiled_job
+from services.ranking import NO_RANK, guild_rank, parse_profile
+from services.raiderio import RaiderIOClient, profile_key
+from services.state import StateStore
+
+log = logging.getLogger(__name__)
+
+GROUP_NAME = "guild_rank_group"
+JOB_ID = "guild_rank_check"
+DEFAULT_RAID_SLUG = "manaforge-omega"
+DEFAULT_CRON_SCHEDULE = "*/15 * * * *"
+DEFAULT_CONCURRENCY_LIMIT = 5
+# All due groups have to be fetched within this time; guilds still pending keep their last known ranks
+FETCH_DEADLINE_SECONDS = 90
+PROFILE_FIELDS = "raid_progression,raid_rankings"
+THUMBNAIL_URL = "https://cdn.raiderio.net/images/brand/Icon_2ColorWhite.png"
+# Discord allows 25 fields per embed; the last one is the update time
+MAX_GUILD_FIELDS = 24
+# /ranktrend shows at most this many points of the requested range
+TREND_POINTS = 24
+SPARK_BARS = "▁▂▃▄▅▆▇█"
+
+loader = lightbulb.Loader()
+
+_client: RaiderIOClient | None = None
+# per rank group, loaded from the state store on the group's first check and kept up to date in memory after that
+_leaderboards: dict[str, Leaderboard] = {}
+_snapshots: dict[str, dict[str, dict]] = {}
+_messages: dict[str, dict[int, tuple[int, str | None]]] = {}
+
+
+def rank_groups(config) -> dict[str, dict]:
+    """Every configured rank group by name. A lone ``guild_rank_group`` keeps that name as its group name."""
+    groups = {}
+    if config.get(GROUP_NAME):
+        groups[GROUP_NAME] = config[GROUP_NAME]
+    groups.update(config.get("guild_rank_groups") or {})
+    return groups
+
+
+def concurrency_limit(groups) -> int:
+    return max((info.get("concurrency_limit", DEFAULT_CONCURRENCY_LIMIT) for info in groups.values()),
+               default=DEFAULT_CONCURRENCY_LIMIT)
+
+
+@loader.listener(hikari.StartedEvent)
+async def on_started(
+        event: hikari.StartedEvent,
+        sched: AsyncIOScheduler,
+        session: aiohttp.ClientSession,
+        state: StateStore,
+        rest: hikari.api.RESTClient,
+) -> None:
+    global _client
+    groups = rank_groups(get_config())
+    _client = RaiderIOClient(session, get_raiderio_token(), concurrency_limit(groups))
+    config_service.subscribe(functools.partial(on_config_reloaded, sched, rest, state))
+    # registered even without groups, so groups added by a later reload get their history compacted too
+    sched.add_job(
+        state.compact_rank_history, CronTrigger(hour=4), id="rank_history_compact", replace_existing=True
+    )
+    if not groups:
+        log.info("No guild rank groups configured, guild rank tracker is idle")
+        return
+    for name, info in groups.items():
+        await migrate_group_files(state, name, info)
+    await check_guild_ranks(rest, state)
+    schedule_guild_rank_jobs(sched, rest, state, groups)
+
+
+async def migrate_group_files(state: StateStore, name, info):
+    if info.get("filename"):
+        await state.migrate_rank_file(name, info["filename"])
+    # only the original single group had a default message file
+    message_file = info.get("message_filename", "guild_rank_message.json" if name == GROUP_NAME else None)
+    if message_file:
+        for ch_key, channel_id in _channel_ids(info).items():
+            await state.migrate_message_id_file(name, channel_id, f"{message_file}_{ch_key}")
+
+
+def schedule_guild_rank_jobs(sched: AsyncIOScheduler, rest: hikari.api.RESTClient, state: StateStore, groups):
+    """Schedule one job per distinct cron schedule, so groups that are due together share one fetch."""
+    by_cron = {}
+    for name, info in groups.items():
+        by_cron.setdefault(info.get("cron_schedule", DEFAULT_CRON_SCHEDULE), []).append(name)
+    wanted = {f"{JOB_ID}:{cron}" for cron in by_cron}
+    for job in sched.get_jobs():
+        if job.id.startswith(f"{JOB_ID}:") and job.id not in wanted:
+            sched.remove_job(job.id)
+    for cron_schedule, names in by_cron.items():
+        sched.add_job(
+            check_guild_ranks,
+            CronTrigger.from_crontab(cron_schedule),
+            args=[rest, state, names],
+            max_instances=1,
+            replace_existing=True,
+            id=f"{JOB_ID}:{cron_schedule}",
+        )
+        log.info("Guild rank groups %s scheduled with cron '%s'", ", ".join(names), cron_schedule)
+
+
+async def on_config_reloaded(sched: AsyncIOScheduler, rest: hikari.api.RESTClient, state: StateStore, old, new):
+    old_groups, groups = rank_groups(old), rank_groups(new)
+    if old_groups == groups:
+        return
+    for name in old_groups.keys() - groups.keys():
+        _leaderboards.pop(name, None)
+        _snapshots.pop(name, None)
+        _messages.pop(name, None)
+    if not groups:
+        schedule_guild_rank_jobs(sched, rest, state, {})
+        log.info("All guild rank groups removed, guild rank tracker stopped")
+        return
+    for name in groups.keys() - old_groups.keys():
+        await migrate_group_files(state, name, groups[name])
+    _client.set_concurrency_limit(concurrency_limit(groups))
+    schedule_guild_rank_jobs(sched, rest, state, groups)
+
+
+@profiled_job("guild_rank_check")
+async def check_guild_ranks(rest: hikari.api.RESTClient, state: StateStore, names=None):
+    """Fetch every guild of the given rank groups (all of them by default) once and update each group."""
+    groups = rank_groups(get_config())
+    if names is not None:
+        groups = {name: groups[name] for name in names if name in groups}
+    if not groups:
+        return
+    guilds = [guild for info in groups.values() for guild in info["guilds"]]
+    log.info("Checking ranks of %d guilds in %d group(s)", len(guilds), len(groups), extra={"repeat": True})
+    # one bounded concurrent fetch on the shared session; a guild listed in several groups is fetched once
+    profiles = await _client.guild_profiles(guilds, PROFILE_FIELDS, FETCH_DEADLINE_SECONDS)
+    await asyncio.gather(*(update_group(rest, state, name, info, profiles) for name, info in groups.items()))
+
+
+async def update_group(rest: hikari.api.RESTClient, state: StateStore, group, info, profiles):
+    raid_slug = info.get("raid_slug", DEFAULT_RAID_SLUG)
+    if group not in _snapshots:
+        # read once; afterwards the in-memory copy is kept in step with what gets saved
+        _snapshots[group] = await state.get_rank_snapshots(group)
+        _leaderboards[group] = Leaderboard(attrgetter("sort_key"))
+    snapshots, leaderboard = _snapshots[group], _leaderboards[group]
+
+    changed = {}
+    samples = []
+    configured = set()
+    for guild in info["guilds"]:
+        key = guild_key(guild)
+        configured.add(key)
+        profile = profiles.get(profile_key(guild["region"], guild["realm"], guild["name"]))
+        if profile is None:
+            # a failed or late fetch keeps showing the last known ranks
+            if key not in leaderboard:
+                leaderboard.update(key, guild_rank(key, guild, snapshots.get(key)))
+            continue
+        ranks = parse_profile(profile, raid_slug)
+        record = guild_rank(key, guild, ranks)
+        samples.append(history_sample(record))
+        if ranks != snapshots.get(key):
+            log.info("Rank update for %s: %s -> %s", guild["name"], snapshots.get(key), ranks)
+            changed[key] = ranks
+        leaderboard.update(key, record)
+    for key in leaderboard.keys() - configured:
+        leaderboard.remove(key)
+
+    await state.append_rank_history(group, samples)
+    if changed:
+        await state.save_rank_snapshots(group, changed)
+        snapshots.update(changed)
+
+    title = f"Guild World Ranks   -   {raid_title(raid_slug)}"
+    fields = render_fields(leaderboard.top(MAX_GUILD_FIELDS))
+    await post_rank_embed(rest, state, group, info, title, fields, content_hash(title, fields))
+
+
+def raid_title(raid_slug):
+    return raid_slug.replace("-", " ").title()
+
+
+def history_sample(record):
+    def rank(value):
+        return value if value < NO_RANK else None
+
+    return record.key, rank(record.mythic), rank(record.heroic), rank(record.normal), record.score
+
+
+def render_fields(records):
+    """Render leaderboard records as ``(name, value)`` embed fields."""
+    fields = []
+    for record in records:
+        # show the best available rank
+        best = record.best_rank()
+        best = f"{best[0]} #{best[1]}" if best else "N/A"
+        profile_url = (
+            f"https://raider.io/guilds/{record.region.lower()}/{quote(record.realm.lower())}/{quote(record.name)}"
+        )
+        fields.append((record.name, f"World Rank: {best}\nProgress: {record.summary}\n[Raider.IO Link]({profile_url})"))
+    return fields
+
+
+def create_rank_embed(title, fields):
+    embed = hikari.Embed(title=title, color=0x0070FF)
+    embed.set_thumbnail(THUMBNAIL_URL)
+    for name, value in fields:
+        embed.add_field(name=name, value=value, inline=False)
+    embed.add_field(name="Last Update", value=f"<t:{int(datetime.now(timezone.utc).timestamp())}:R>", inline=False)
+    return embed
+
+
+def _channel_ids(info) -> dict[str, int]:
+    channel_keys = info["channel_key"]
+    if isinstance(channel_keys, str):
+        channel_keys = [channel_keys]
+    channel_ids = get_config()["channel_ids"]
+    resolved = {}
+    for ch_key in channel_keys:
+        if channel_ids.get(ch_key):
+            resolved[ch_key] = int(channel_ids[ch_key])
+        else:
+            log.warning("Channel key '%s' not found in config channel_ids", ch_key)
+    return resolved
+
+
+async def post_rank_embed(rest: hikari.api.RESTClient, state: StateStore, group, info, title, fields, digest):
+    """Bring the leaderboard message of every configured channel up to date.
+
+    ``digest`` is the hash of the visible content without the update time. Channels whose message
+    already shows that content are left alone, so Discord is only called on a visible change.
+    """
+    if group not in _messages:
+        _messages[group] = await state.get_leaderboard_messages(group)
+    messages = _messages[group]
+    stale = [
+        channel_id for channel_id in _channel_ids(info).values()
+        if messages.get(channel_id, (None, None))[1] != digest
+    ]
+    if not stale:
+        log.info("Guild rank leaderboard of %s unchanged, no edits needed", group, extra={"source": group, "repeat": True})
+        return
+    embed = create_rank_embed(title, fields)
+
+    async def post(channel_id):
+        message_id = messages.get(channel_id, (None, None))[0]
+        try:
+            if message_id:
+                await rest.edit_message(channel_id, message_id, embed=embed)
+            else:
+                message_id = int((await rest.create_message(channel_id, embed=embed)).id)
+        except hikari.HikariError as e:
+            log.error("Failed to send/edit guild rank message: %s", e, extra={"channel_id": channel_id})
+            return
+        messages[channel_id] = (message_id, digest)
+        await state.save_leaderboard_message(group, channel_id, message_id, digest)
+
+    await asyncio.gather(*(post(channel_id) for channel_id in stale))
+    log.info("Guild rank leaderboard of %s updated in %d channel(s)", group, len(stale))
+
+
+def guild_key(guild):
+    return f"{guild['region']}:{guild['realm']}:{guild['name']}"
+
+
+def find_guild(query, group=None):
+    """Find a configured guild by its key or, case-insensitively, by its name.
+
+    Returns ``(group name, group, guild)`` from ``group`` if given, else from the first group listing
+    the guild, or None.
+    """
+    groups = rank_groups(get_config())
+    if group is not None:
+        groups = {group: groups[group]} if group in groups else {}
+    for matches in (
+            lambda g: guild_key(g) == query,
+            lambda g: g["name"].casefold() == query.strip().casefold(),
+    ):
+        for name, info in groups.items():
+            guild = next((g for g in info["guilds"] if matches(g)), None)
+            if guild is not None:
+                return name, info, guild
+    return None
+
+
+async def autocomplete_guild(ctx: lightbulb.AutocompleteContext[str]) -> None:
+    typed = str(ctx.focused.value or "").casefold()
+    choices = {}
+    for info in rank_groups(get_config()).values():
+        for g in info["guilds"]:
+            if typed in g["name"].casefold():
+                choices.setdefault(guild_key(g), f"{g['name']} ({g['realm']}-{g['region'].upper()})")
+    await ctx.respond([(label, key) for key, label in choices.items()][:25])
+
+
+async def autocomplete_group(ctx: lightbulb.AutocompleteContext[str]) -> None:
+    typed = str(ctx.focused.value or "").casefold()
+    await ctx.respond([name for name in rank_groups(get_config()) if typed in name.casefold()][:25])
+
+
+def format_score(score):
+    difficulty = {3: "M", 2: "H", 1: "N"}.get(score // 1000)
+    return f"{score % 1000} {difficulty}" if difficulty else "N/A"
+
+
+def sparkline(values):
+    """Bars for ``values`` where a lower number (a better rank) is a taller bar; gaps show as spaces."""
+    known = [v for v in values if v is not None]
+    if not known:
+        return ""
+    best, worst = min(known), max(known)
+    span = (worst - best) or 1
+    top = len(SPARK_BARS) - 1
+    return "".join(" " if v is None else SPARK_BARS[top - round((v - best) * top / span)] for v in values)
+
+
+def create_trend_embed(guild, raid_slug, history, days):
+    embed = hikari.Embed(
+        title=f"Rank trend - {guild['name']}", description=f"{raid_title(raid_slug)}, last {days} days", color=0x0070FF
+    )
+    embed.set_thumbnail(THUMBNAIL_URL)
+    first, last = history[0], history[-1]
+    for column, label in ((1, "Mythic"), (2, "Heroic"), (3, "Normal")):
+        ranks = [row[column] for row in history]
+        known = [r for r in ranks if r is not None]
+        if not known:
+            continue
+        now = f"#{last[column]}" if last[column] is not None else "N/A"
+        start = f"#{first[column]}" if first[column] is not None else "N/A"
+        embed.add_field(
+            name=f"{label} world rank",
+            value=f"{start} → **{now}** (best #{min(known)})\n`{sparkline(ranks)}`",
+            inline=False,
+        )
+    embed.add_field(
+        name="Progress",
+        value=f"{format_score(first[4])} → **{format_score(last[4])}**",
+        inline=False,
+    )
+    embed.add_field(name="Samples", value=f"<t:{first[0]}:d> to <t:{last[0]}:R>", inline=False)
+    return embed
+
+
+@loader.command
+class RankTrend(
+    lightbulb.SlashCommand,
+    name="ranktrend",
+    description="Shows how a tracked guild's world rank moved",
+):
+    guild = lightbulb.string("guild", "Name of the guild", autocomplete=autocomplete_guild)
+    group = lightbulb.string(
+        "group", "Rank group, if the guild is in several", default=None, autocomplete=autocomplete_group
+    )
+    days = lightbulb.integer("days", "How far back to look", default=30, min_value=1, max_value=365)
+
+    @lightbulb.invoke
+    async def invoke(self, ctx: lightbulb.Context, state: StateStore) -> None:
+        found = find_guild(self.guild, self.group)
+        if found is None:
+            await ctx.respond(f"'{self.guild}' is not a tracked guild.", flags=hikari.MessageFlag.EPHEMERAL)
+            return
+        group, info, guild = found
+        since = time.time() - self.days * 86400
+        history = await state.rank_history(group, guild_key(guild), since, TREND_POINTS)
+        if not history:
+            await ctx.respond(f"No rank history for {guild['name']} yet.", flags=hikari.MessageFlag.EPHEMERAL)
+            return
+        raid_slug = info.get("raid_slug", DEFAULT_RAID_SLUG)
+        await ctx.respond(embed=create_trend_embed(guild, raid_slug, history, self.days))
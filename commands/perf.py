@@ -0,0 +1,54 @@
+import hikari
+import lightbulb
+
+from services.profiling import profiling_enabled, slowest_jobs
+
+loader = lightbulb.Loader()
+
+# Discord's limit for an embed field value
+FIELD_VALUE_LIMIT = 1024
+
+
+def format_job(stats):
+    slowest = stats.slowest_runs()[0]
+    return (
+        f"**Runs:** {stats.runs} ({stats.errors} failed) · **Avg:** {stats.avg_wall:.2f}s · "
+        f"**Max:** {stats.max_wall:.2f}s\n"
+        f"**Network:** {stats.total_network / stats.runs:.2f}s avg · **CPU:** {stats.total_cpu / stats.runs:.2f}s avg\n"
+        f"**Slowest run:** <t:{int(slowest.started_at)}:R>, {slowest.network:.2f}s network, "
+        f"{slowest.cpu:.2f}s CPU"
+    )
+
+
+def create_perf_embed(jobs):
+    embed = hikari.Embed(title="Slowest scheduled jobs", color=0x5865F2)
+    for stats in jobs:
+        embed.add_field(name=stats.name, value=format_job(stats), inline=False)
+
+    profiled = next((span for stats in jobs for span in stats.slowest_runs() if span.profile), None)
+    if profiled is not None:
+        header = f"cProfile of {profiled.name} ({profiled.wall:.2f}s)"
+        profile = profiled.profile.strip()[:FIELD_VALUE_LIMIT - 8]
+        embed.add_field(name=header, value=f"```\n{profile}```", inline=False)
+    return embed
+
+
+@loader.command
+class Perf(
+    lightbulb.SlashCommand,
+    name="perf",
+    description="Shows the slowest scheduled jobs",
+    default_member_permissions=hikari.Permissions.ADMINISTRATOR,
+):
+    top = lightbulb.integer("top", "How many jobs to show", default=5, min_value=1, max_value=20)
+
+    @lightbulb.invoke
+    async def invoke(self, ctx: lightbulb.Context) -> None:
+        if not profiling_enabled():
+            await ctx.respond("Profiling is off. Set profiling.enabled in config.json.", flags=hikari.MessageFlag.EPHEMERAL)
+            return
+        jobs = slowest_jobs(self.top)
+        if not jobs:
+            await ctx.respond("No job runs recorded yet.", flags=hikari.MessageFlag.EPHEMERAL)
+            return
+        await ctx.respond(embed=create_perf_embed(jobs), flags=hikari.MessageFlag.EPHEMERAL)
@@ -1,37 +1,103 @@
+import re
+
 import hikari
 import lightbulb
-import lichess.api
+from commands.chesstv import TEAM_PLAYERS
+from services.lichess import LichessClient, LichessApiError
 
 loader = lightbulb.Loader()
 
+TEAMS = {
+    "trollit": list(TEAM_PLAYERS.values()),
+}
+
+
+def perf_value(user, perf, field):
+    return user.get('perfs', {}).get(perf, {}).get(field, "-")
+
+
+def create_rating_embed(player, user):
+    embed = hikari.Embed(title=f'Ratings of the player {player}.', color=0xbc0057)
+    embed.add_field(
+        name="Blitz:",
+        value=f"**Rating:** {perf_value(user, 'blitz', 'rating')} **Games:** {perf_value(user, 'blitz', 'games')}",
+        inline=False,
+    )
+    embed.add_field(
+        name="Rapid:",
+        value=f"**Rating:** {perf_value(user, 'rapid', 'rating')} **Games:** {perf_value(user, 'rapid', 'games')}",
+        inline=False,
+    )
+    embed.add_field(
+        name="Puzzle:",
+        value=f"**Rating:** {perf_value(user, 'puzzle', 'rating')} **Puzzles:** {perf_value(user, 'puzzle', 'games')}",
+        inline=False,
+    )
+    return embed
+
+
+def create_leaderboard_embed(title, users, not_found):
+    def blitz_rating(user):
+        rating = perf_value(user, 'blitz', 'rating')
+        return rating if isinstance(rating, int) else 0
+
+    lines = []
+    for position, user in enumerate(sorted(users, key=blitz_rating, reverse=True), start=1):
+        lines.append(
+            f"**{position}. {user.get('username', user['id'])}** - "
+            f"Blitz {perf_value(user, 'blitz', 'rating')} · "
+            f"Rapid {perf_value(user, 'rapid', 'rating')} · "
+            f"Puzzle {perf_value(user, 'puzzle', 'rating')}"
+        )
+
+    embed = hikari.Embed(title=title, description="\n".join(lines) or "No players found.", color=0xbc0057)
+    if not_found:
+        embed.add_field(name="Not found:", value=", ".join(not_found), inline=False)
+    return embed
+
 
 @loader.command
 class Rating(
     lightbulb.SlashCommand,
     name="rating",
-    description="Sends the Lichess rating of the player",
+    description="Sends the Lichess rating of one or more players",
 ):
-    player = lightbulb.string("player", "Name of the player")
+    player = lightbulb.string("player", "Name of the player, or several separated by commas", default=None)
+    team = lightbulb.string(
+        "team",
+        "Compare a whole team instead",
+        choices=[lightbulb.Choice("Trollit", "trollit")],
+        default=None,
+    )
 
     @lightbulb.invoke
-    async def invoke(self, ctx: lightbulb.Context) -> None:
-        try:
-            user1 = lichess.api.user(self.player)
-        except lichess.api.ApiHttpError:
-            await ctx.respond(f"Player `{self.player}` not found on Lichess.")
+    async def invoke(self, ctx: lightbulb.Context, lichess: LichessClient) -> None:
+        players = [p for p in re.split(r"[,\s]+", self.player or "") if p]
+        if self.team:
+            players += TEAMS[self.team]
+        if not players:
+            await ctx.respond("Give a player name or pick a team.")
             return
 
-        blitz_rating1 = user1['perfs']['blitz']['rating']
-        blitz_games1 = user1['perfs']['blitz']['games']
-        rapid_rating1 = user1['perfs']['rapid']['rating']
-        rapid_games1 = user1['perfs']['rapid']['games']
-        puzzle_rating1 = user1['perfs']['puzzle']['rating']
-        puzzle_games1 = user1['perfs']['puzzle']['games']
+        try:
+            if len(players) == 1:
+                user = await lichess.get_user(players[0])
+                users = {players[0].lower(): user}
+            else:
+                users = await lichess.get_users(players)
+        except LichessApiError:
+            await ctx.respond("Lichess is not responding right now, try again later.")
+            return
 
-        embed = hikari.Embed(title=f'Ratings of the player {self.player}.', color=0xbc0057)
-        embed.add_field(name="Blitz:", value=f'**Rating:** {blitz_rating1} **Games:** {blitz_games1}', inline=False)
-        embed.add_field(name="Rapid:", value=f'**Rating:** {rapid_rating1} **Games:** {rapid_games1}', inline=False)
-        embed.add_field(name="Puzzle:", value=f'**Rating:** {puzzle_rating1} **Puzzles:** {puzzle_games1}',
-                        inline=False)
+        if len(users) == 1:
+            user = next(iter(users.values()))
+            if user is None:
+                await ctx.respond(f"Player `{players[0]}` not found on Lichess.")
+                return
+            await ctx.respond(embed=create_rating_embed(players[0], user))
+            return
 
-        await ctx.respond(embed=embed)
+        found = [user for user in users.values() if user is not None]
+        not_found = [p for p in dict.fromkeys(players) if users.get(p.lower()) is None]
+        title = f"Lichess ratings of team {self.team}." if self.team else "Lichess ratings."
+        await ctx.respond(embed=create_leaderboard_embed(title, found, not_found))
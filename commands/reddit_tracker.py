@@ -1,12 +1,27 @@
+import asyncio
+import functools
+import logging
 import os
+import time
 import hikari
 import lightbulb
 import asyncpraw
+from asyncprawcore.exceptions import RequestException, ServerError, TooManyRequests
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from dotenv import load_dotenv
 
 from utils import get_config, hex_to_int
+from services.config import config_service
+from services.polling import (
+    POLL_TICK_SECONDS, adaptive_settings, collect_due, rebuild_schedules, reload_sources, request_budget,
+)
+from services.ratelimit import TokenBucket
+from services.metrics import ANNOUNCEMENTS, ERRORS, FETCH_LATENCY
+from services.profiling import profile_span, profiled_job
+from services.resilience import REDDIT_HOST, CircuitOpenError, call_with_retry
+from services.dispatcher import MessageDispatcher
+from services.state import StateStore
 
 load_dotenv()
 
@@ -17,11 +32,56 @@ REDDIT_USER_AGENT = os.getenv(
     "script:reddit_to_discord:v1.0 (by /u/YOUR_USERNAME)"
 )
 
+# How many of the newest items are checked for a user that has no stored cursor yet
+DEFAULT_BACKFILL_LIMIT = 25
+# Reddit's OAuth budget is 600 requests per 10 minute window
+REDDIT_REQUESTS_PER_SECOND = 1.0
+REDDIT_BURST = 10
+# Length of Reddit's rate limit window, for when the reset time isn't reported
+REDDIT_RATE_WINDOW_SECONDS = 600
+# A poll reads the submissions and the comments listing, so it costs the adaptive budget this much
+REQUESTS_PER_POLL = 2
+LISTING_PAGE_SIZE = 100
+
 reddit = None
+request_bucket = TokenBucket(REDDIT_REQUESTS_PER_SECOND, REDDIT_BURST)
+
+log = logging.getLogger(__name__)
 
 loader = lightbulb.Loader()
 
 
+def comments_filename(base_filename):
+    return base_filename.replace(".txt", "_comments.txt")
+
+
+class RedditSource:
+    """Everything the poller needs for one tracked Reddit user, resolved once per config snapshot."""
+
+    __slots__ = ("name", "username", "submissions_key", "comments_key", "color", "channels", "cron_schedule")
+
+    def __init__(self, name, source, channel_ids):
+        self.name = name
+        self.username = source["username"]
+        self.submissions_key = source.get("filename", f"reddit/{self.username}.txt")
+        self.comments_key = comments_filename(self.submissions_key)
+        self.color = hex_to_int(source.get("color", "#ffffff"))
+        self.channels = tuple(channel_ids[ch] for ch in source["channels"] if ch in channel_ids)
+        for ch in source["channels"]:
+            if ch not in channel_ids:
+                log.warning("Channel key '%s' of source %s not found in config channel_ids", ch, name, extra={"source": name})
+        self.cron_schedule = source.get("cron_schedule", "*/5 * * * *")
+
+
+def compile_reddit_sources(config) -> dict[str, RedditSource]:
+    channel_ids = config.get("channel_ids", {})
+    return {name: RedditSource(name, source, channel_ids) for name, source in config.get("reddit_sources", {}).items()}
+
+
+_sources: dict[str, RedditSource] = {}
+_schedules: dict = {}
+
+
 def setup_reddit():
     global reddit
     reddit = asyncpraw.Reddit(
@@ -32,138 +92,222 @@ def setup_reddit():
 
 
 @loader.listener(hikari.StartedEvent)
-async def on_started(event: hikari.StartedEvent, bot: hikari.GatewayBot, sched: AsyncIOScheduler) -> None:
+async def on_started(
+        event: hikari.StartedEvent,
+        dispatcher: MessageDispatcher,
+        sched: AsyncIOScheduler,
+        state: StateStore,
+) -> None:
     setup_reddit()
-    await run_initial_check(bot)
-    await initialize_reddit_checks(bot, sched)
+    _sources.clear()
+    _sources.update(compile_reddit_sources(get_config()))
+    await migrate_reddit_state(state, _sources.values())
+    await run_initial_check(dispatcher, state)
+    await initialize_reddit_checks(dispatcher, sched, state)
+    config_service.subscribe(functools.partial(on_config_reloaded, state))
+
+
+async def migrate_reddit_state(state: StateStore, sources):
+    keys = []
+    for source in sources:
+        keys += [source.submissions_key, source.comments_key]
+    await state.migrate_id_files(keys)
+
+
+async def initialize_reddit_checks(dispatcher: MessageDispatcher, sched: AsyncIOScheduler, state: StateStore):
+    rebuild_schedules(_sources, _schedules, get_config())
+
+    sched.add_job(
+        poll_due_reddit_sources,
+        IntervalTrigger(seconds=POLL_TICK_SECONDS),
+        args=[dispatcher, state],
+        misfire_grace_time=None,
+        max_instances=1,
+        replace_existing=True,
+        id="reddit_poll"
+    )
 
 
-async def initialize_reddit_checks(bot: hikari.GatewayBot, sched: AsyncIOScheduler):
-    config = get_config()
-    reddit_sources = config.get("reddit_sources", {})
-    channel_ids = config.get("channel_ids", {})
+async def on_config_reloaded(state: StateStore, old, new):
+    """Recompile the sources and update the poll schedule for ones that were added, removed or edited."""
+    compiled = compile_reddit_sources(new)
+    added, removed, changed = reload_sources(
+        _sources, _schedules, compiled, old.get("reddit_sources", {}), new.get("reddit_sources", {}), new
+    )
+    if not (added or removed or changed):
+        return
+    await migrate_reddit_state(state, [compiled[name] for name in added | changed])
+    log.info("Reddit sources reloaded: added %s, removed %s, changed %s", sorted(added), sorted(removed), sorted(changed))
 
-    for name, source in reddit_sources.items():
-        username = source["username"]
-        color_int = hex_to_int(source.get("color", "#ffffff"))
-        filename = source.get("filename", f"reddit/{username}.txt")
-        channels = [channel_ids[ch] for ch in source["channels"]]
-        cron_schedule = source.get("cron_schedule", "*/5")
-
-        sched.add_job(
-            check_and_announce_reddit,
-            CronTrigger.from_crontab(cron_schedule),
-            args=[bot, username, filename, color_int, channels],
-            misfire_grace_time=None,
-            replace_existing=True,
-            id=f"reddit_{username}"
-        )
 
+async def run_initial_check(dispatcher: MessageDispatcher, state: StateStore):
+    await poll_reddit_sources(dispatcher, state, list(_sources))
 
-async def run_initial_check(bot: hikari.GatewayBot):
-    config = get_config()
-    reddit_sources = config.get("reddit_sources", {})
-    channel_ids = config.get("channel_ids", {})
 
-    for name, source in reddit_sources.items():
-        username = source["username"]
-        color_int = hex_to_int(source.get("color", "#ffffff"))
-        filename = source.get("filename", f"reddit/{username}.txt")
-        channels = [channel_ids[ch] for ch in source["channels"]]
-        await check_and_announce_reddit(bot, username, filename, color_int, channels)
+@profiled_job("reddit_poll")
+async def poll_due_reddit_sources(dispatcher: MessageDispatcher, state: StateStore):
+    due = collect_due(
+        _schedules, budget=request_budget(adaptive_settings(get_config())), cost=REQUESTS_PER_POLL
+    )
+    if due:
+        await poll_reddit_sources(dispatcher, state, due)
 
 
-async def check_and_announce_reddit(bot, username, base_filename, color, channels):
-    new_submissions = await fetch_all_submissions(username)
-    if new_submissions:
-        await announce_submissions(bot, username, base_filename, color, channels, new_submissions)
-    else:
-        print(f"[Reddit] No submissions found for u/{username}.")
+async def poll_reddit_sources(dispatcher: MessageDispatcher, state: StateStore, source_names):
+    """Check every named source concurrently; the shared token bucket keeps the combined request rate in budget."""
+    sources = [_sources[name] for name in source_names if name in _sources]
+    results = await asyncio.gather(
+        *(check_and_announce_reddit(dispatcher, state, source) for source in sources),
+        return_exceptions=True,
+    )
+    for source, result in zip(sources, results):
+        if isinstance(result, Exception):
+            log.error("Reddit check failed: %s", result, extra={"source": source.name})
+        schedule = _schedules.get(source.name)
+        if schedule is not None:
+            schedule.record_activity(result is True)
+
+
+async def check_and_announce_reddit(dispatcher, state, source):
+    """Check a user's submissions and comments; returns whether either had something new."""
+    backfill_limit = get_config().get("reddit_backfill_limit", DEFAULT_BACKFILL_LIMIT)
+    async with profile_span(f"reddit:{source.name}"):
+        found = await asyncio.gather(
+            check_submissions(dispatcher, state, source, backfill_limit),
+            check_comments(dispatcher, state, source, backfill_limit),
+        )
+    return any(found)
+
+
+async def check_submissions(dispatcher, state, source, backfill_limit):
+    cursor = await state.get_cursor(source.submissions_key)
+    new_submissions = await fetch_new_submissions(source.username, cursor, backfill_limit)
+    # the newest item seen before is fetched again, so only unannounced items count as activity
+    had_new, all_delivered = await announce_submissions(dispatcher, state, source, new_submissions)
+    if had_new:
+        if all_delivered:
+            # only move past these items once all of them went out, so failed ones are retried
+            await state.set_cursor(source.submissions_key, max(s.created_utc for s in new_submissions))
+        return True
+    log.info("No new submissions found for u/%s", source.username, extra={"source": source.name, "repeat": True})
+    return False
+
+
+async def check_comments(dispatcher, state, source, backfill_limit):
+    cursor = await state.get_cursor(source.comments_key)
+    new_comments = await fetch_new_comments(source.username, cursor, backfill_limit)
+    # the newest item seen before is fetched again, so only unannounced items count as activity
+    had_new, all_delivered = await announce_comments(dispatcher, state, source, new_comments)
+    if had_new:
+        if all_delivered:
+            # only move past these items once all of them went out, so failed ones are retried
+            await state.set_cursor(source.comments_key, max(c.created_utc for c in new_comments))
+        return True
+    log.info("No new comments found for u/%s", source.username, extra={"source": source.name, "repeat": True})
+    return False
+
+
+def sync_rate_limit():
+    """Feed the rate limit state Reddit reported on the last response into our token bucket."""
+    if reddit is None:
+        return
+    limits = reddit.auth.limits
+    if limits.get("remaining") is None:
+        return
+    # only some asyncpraw releases expose the reset time; otherwise assume a full window is left
+    reset_timestamp = limits.get("reset_timestamp")
+    seconds_to_reset = reset_timestamp - time.time() if reset_timestamp else REDDIT_RATE_WINDOW_SECONDS
+    request_bucket.observe(limits["remaining"], seconds_to_reset)
 
-    new_comments = await fetch_all_comments(username)
-    if new_comments:
-        comments_filename = base_filename.replace(".txt", "_comments.txt")
-        await announce_comments(bot, username, comments_filename, color, channels, new_comments)
-    else:
-        print(f"[Reddit] No comments found for u/{username}.")
 
+async def collect_newer_than(listing, cursor):
+    """Read a newest-first listing until reaching an item older than ``cursor``, so older pages are never requested.
 
-async def fetch_all_submissions(username: str):
+    Items from the cursor's own second are kept; the ones already announced are dropped by the dedup state.
+    """
     results = []
-    try:
-        redditor = await reddit.redditor(username)
-        async for submission in redditor.submissions.new(limit=None):
-            results.append(submission)
-    except Exception as ex:
-        print(f"[Error] while fetching submissions for {username}: {ex}")
+    items = listing.__aiter__()
+    while True:
+        if len(results) % LISTING_PAGE_SIZE == 0:
+            # the listing fetches a new page every LISTING_PAGE_SIZE items
+            await request_bucket.acquire()
+        try:
+            item = await items.__anext__()
+        except StopAsyncIteration:
+            break
+        finally:
+            sync_rate_limit()
+        if cursor is not None and item.created_utc < cursor:
+            break
+        results.append(item)
     return results
 
 
-async def fetch_all_comments(username: str):
-    results = []
-    try:
+async def fetch_listing(username: str, kind: str, cursor: float | None, backfill_limit: int):
+    """Read the new ``submissions`` or ``comments`` of a user behind the Reddit circuit breaker."""
+    async def read():
         redditor = await reddit.redditor(username)
-        async for comment in redditor.comments.new(limit=None):
-            results.append(comment)
-    except Exception as ex:
-        print(f"[Error] while fetching comments for {username}: {ex}")
-    return results
+        # Without a cursor (first run) only look back backfill_limit items instead of the whole history
+        listing = getattr(redditor, kind).new(limit=None if cursor is not None else backfill_limit)
+        return await collect_newer_than(listing, cursor)
 
+    try:
+        with FETCH_LATENCY.labels("reddit", f"{username}/{kind}").time():
+            return await call_with_retry(REDDIT_HOST, read, retry_on=(RequestException, ServerError, TooManyRequests))
+    except CircuitOpenError:
+        pass
+    except Exception as ex:
+        log.warning("Error while fetching %s for u/%s: %s", kind, username, ex)
+        ERRORS.labels("reddit").inc()
+    return []
 
-async def announce_submissions(bot, username, filename, color, channels, submissions):
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
 
-    seen_ids = set()
-    if os.path.exists(filename):
-        with open(filename, "r") as f:
-            seen_ids = set(line.strip() for line in f)
+async def fetch_new_submissions(username: str, cursor: float | None, backfill_limit: int):
+    return await fetch_listing(username, "submissions", cursor, backfill_limit)
 
-    unannounced = [s for s in submissions if s.id not in seen_ids]
-    if not unannounced:
-        print(f"[Reddit] All submissions by u/{username} already announced.")
-        return
 
-    unannounced.sort(key=lambda s: s.created_utc)
-    print(f"[Reddit] Found {len(unannounced)} new submissions by u/{username}.")
+async def fetch_new_comments(username: str, cursor: float | None, backfill_limit: int):
+    return await fetch_listing(username, "comments", cursor, backfill_limit)
 
-    for submission in unannounced:
-        embed = create_submission_embed(submission, color)
-        for cid in channels:
-            await bot.rest.create_message(cid, embed=embed)
-        seen_ids.add(submission.id)
 
-    with open(filename, "w") as f:
-        f.write("\n".join(seen_ids))
+async def announce_submissions(dispatcher, state, source, submissions):
+    """Announce the submissions not announced yet. Returns (whether there were any, whether all went out)."""
+    username = source.username
+    unseen_ids = set(await state.unseen(source.submissions_key, [s.id for s in submissions]))
+    unannounced = [s for s in submissions if s.id in unseen_ids]
+    if not unannounced:
+        return False, True
 
-    print(f"[Reddit] Announced {len(unannounced)} new submissions for u/{username}.")
+    unannounced.sort(key=lambda s: s.created_utc)
+    log.info("Found %d new submissions by u/%s", len(unannounced), username, extra={"source": source.name})
 
+    embeds = [create_submission_embed(submission, source.color) for submission in unannounced]
+    delivered = await dispatcher.deliver(source.channels, embeds)
+    state.mark_seen(source.submissions_key, [submission.id for submission, ok in zip(unannounced, delivered) if ok])
+    ANNOUNCEMENTS.labels("submission", source.name).inc(sum(delivered))
 
-async def announce_comments(bot, username, filename, color, channels, comments):
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    log.info("Announced %d new submissions for u/%s", sum(delivered), username, extra={"source": source.name})
+    return True, all(delivered)
 
-    seen_ids = set()
-    if os.path.exists(filename):
-        with open(filename, "r") as f:
-            seen_ids = set(line.strip() for line in f)
 
-    unannounced = [c for c in comments if c.id not in seen_ids]
+async def announce_comments(dispatcher, state, source, comments):
+    """Announce the comments not announced yet. Returns (whether there were any, whether all went out)."""
+    username = source.username
+    unseen_ids = set(await state.unseen(source.comments_key, [c.id for c in comments]))
+    unannounced = [c for c in comments if c.id in unseen_ids]
     if not unannounced:
-        print(f"[Reddit] All comments by u/{username} already announced.")
-        return
+        return False, True
 
     unannounced.sort(key=lambda c: c.created_utc)
-    print(f"[Reddit] Found {len(unannounced)} new comments by u/{username}.")
-
-    for comment in unannounced:
-        embed = create_comment_embed(comment, color)
-        for cid in channels:
-            await bot.rest.create_message(cid, embed=embed)
-        seen_ids.add(comment.id)
+    log.info("Found %d new comments by u/%s", len(unannounced), username, extra={"source": source.name})
 
-    with open(filename, "w") as f:
-        f.write("\n".join(seen_ids))
+    embeds = [create_comment_embed(comment, source.color) for comment in unannounced]
+    delivered = await dispatcher.deliver(source.channels, embeds)
+    state.mark_seen(source.comments_key, [comment.id for comment, ok in zip(unannounced, delivered) if ok])
+    ANNOUNCEMENTS.labels("comment", source.name).inc(sum(delivered))
 
-    print(f"[Reddit] Announced {len(unannounced)} new comments for u/{username}.")
+    log.info("Announced %d new comments for u/%s", sum(delivered), username, extra={"source": source.name})
+    return True, all(delivered)
 
 
 def create_submission_embed(submission, color):
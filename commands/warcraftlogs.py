@@ -1,118 +1,297 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 import hikari
 import lightbulb
 import aiohttp
-import os
-import os.path
 import asyncio
-from utils import hex_to_int, get_warcraft_logs_token, get_config
+import functools
+import json
+import logging
+from utils import hex_to_int, get_warcraft_logs_token, get_warcraft_logs_client_credentials, get_config
+from services.config import config_service
+from services.http import ResponseValidators, fetch_if_changed
+from services.dispatcher import MessageDispatcher
+from services.state import StateStore
+from services.metrics import ANNOUNCEMENTS, ERRORS, FETCH_LATENCY
+from services.profiling import profile_span, profiled_job
+from services.resilience import CircuitOpenError, UpstreamError
+from services.polling import (
+    POLL_TICK_SECONDS, adaptive_settings, collect_due, rebuild_schedules, reload_sources, request_budget,
+)
+from services.warcraftlogs_api import WarcraftLogsV2Client, WarcraftLogsApiError, v2_report_filter
 
 LOGS_BASE_URL = "https://www.warcraftlogs.com/reports/"
 THUMBNAIL_URL = "https://pbs.twimg.com/profile_images/1550453257947979784/U9D70T0S_400x400.jpg"
 
+log = logging.getLogger(__name__)
+
 loader = lightbulb.Loader()
 
 
-@loader.listener(hikari.StartedEvent)
-async def on_started(event: hikari.StartedEvent, bot: hikari.GatewayBot, sched: AsyncIOScheduler) -> None:
-    await run_checks_once(bot)
-    await initialize_log_checks(bot, sched)
+class LogSource:
+    """Everything the poller needs for one log source, resolved once per config snapshot."""
+
+    __slots__ = ("name", "url", "v2_filter", "state_key", "color", "channels", "cron_schedule", "embed_title")
 
+    def __init__(self, name, source, channel_ids, api_key):
+        self.name = name
+        self.url = f"{source['url']}?api_key={api_key}"
+        self.v2_filter = v2_report_filter(source)
+        self.state_key = f"logs/{source['filename']}"
+        self.color = hex_to_int(source['color'])
+        self.channels = tuple(channel_ids[ch] for ch in source['channels'] if ch in channel_ids)
+        for ch in source['channels']:
+            if ch not in channel_ids:
+                log.warning("Channel key '%s' of source %s not found in config channel_ids", ch, name, extra={"source": name})
+        self.cron_schedule = source.get('cron_schedule', '*/5 * * * *')
+        self.embed_title = f"{name} has uploaded new Warcraft Logs"
 
-async def initialize_log_checks(bot: hikari.GatewayBot, sched: AsyncIOScheduler):
-    warcraft_logs_token = get_warcraft_logs_token()
-    config = get_config()
+
+def compile_log_sources(config) -> dict[str, LogSource]:
+    api_key = get_warcraft_logs_token()
     channel_ids = config['channel_ids']
+    return {name: LogSource(name, source, channel_ids, api_key) for name, source in config['log_sources'].items()}
 
-    for name, source in config['log_sources'].items():
-        formatted_url = f"{source['url']}?api_key={warcraft_logs_token}"
-        color_int = hex_to_int(source['color'])
-        channels = [channel_ids[ch] for ch in source['channels']]
-        cron_schedule = source.get('cron_schedule', '*/5')
 
-        sched.add_job(
-            check_and_announce_logs,
-            CronTrigger.from_crontab(cron_schedule),
-            args=[formatted_url, f"logs/{source['filename']}", color_int, name, channels, bot],
-            misfire_grace_time=None,
-            replace_existing=True,
-            id=name
-        )
+_sources: dict[str, LogSource] = {}
+_schedules: dict = {}
+_validators: dict[str, ResponseValidators] = {}
+_v2_client: WarcraftLogsV2Client | None = None
 
 
-async def run_checks_once(bot: hikari.GatewayBot):
-    config = get_config()
-    semaphore = asyncio.Semaphore(config.get("log_check_concurrency", 5))
+def setup_v2_client(session: aiohttp.ClientSession, config):
+    """Create the GraphQL client when the config selects the v2 API and client credentials are set."""
+    global _v2_client
+    client_id, client_secret = get_warcraft_logs_client_credentials()
+    if config.get("warcraft_logs_api", "v1") != "v2":
+        _v2_client = None
+    elif not (client_id and client_secret):
+        log.warning("warcraft_logs_api is v2 but WARCRAFT_LOGS_CLIENT_ID/SECRET are not set, using v1")
+        _v2_client = None
+    elif _v2_client is None:
+        _v2_client = WarcraftLogsV2Client(session, client_id, client_secret)
 
-    async def sem_check(source_name, source_info):
-        async with semaphore:
-            formatted_url = f"{source_info['url']}?api_key={get_warcraft_logs_token()}"
-            color_int = hex_to_int(source_info['color'])
-            channels = [config['channel_ids'][ch] for ch in source_info['channels']]
-            filename = f"logs/{source_info['filename']}"
-            await check_and_announce_logs(formatted_url, filename, color_int, source_name, channels, bot)
 
-    await asyncio.gather(*(sem_check(name, source) for name, source in config['log_sources'].items()))
+@loader.listener(hikari.StartedEvent)
+async def on_started(
+        event: hikari.StartedEvent,
+        dispatcher: MessageDispatcher,
+        sched: AsyncIOScheduler,
+        session: aiohttp.ClientSession,
+        state: StateStore,
+) -> None:
+    _sources.clear()
+    _sources.update(compile_log_sources(get_config()))
+    setup_v2_client(session, get_config())
+    await state.migrate_id_files(source.state_key for source in _sources.values())
+    await run_checks_once(dispatcher, session, state)
+    await initialize_log_checks(dispatcher, sched, session, state)
+    config_service.subscribe(functools.partial(on_config_reloaded, session, state))
 
 
-async def check_and_announce_logs(url, filename, color, log_source_name, channels, bot):
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                data = await response.json()
-                first_log = data[0]
-                logs_id = first_log['id']
-
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-
-        previous_logs_ids = []
-        if os.path.exists(filename):
-            with open(filename, "r") as f:
-                previous_logs_ids = f.read().splitlines()
-
-        if logs_id not in previous_logs_ids:
-            await announce_new_logs(bot, first_log, logs_id, filename, color, log_source_name, channels)
-        else:
-            print(f"Latest logs have already been announced ID: {logs_id}")
+async def initialize_log_checks(
+        dispatcher: MessageDispatcher,
+        sched: AsyncIOScheduler,
+        session: aiohttp.ClientSession,
+        state: StateStore,
+):
+    rebuild_schedules(_sources, _schedules, get_config())
+
+    # One job polls every due source together instead of one cron job per source
+    sched.add_job(
+        poll_due_sources,
+        IntervalTrigger(seconds=POLL_TICK_SECONDS),
+        args=[dispatcher, session, state],
+        misfire_grace_time=None,
+        max_instances=1,
+        replace_existing=True,
+        id="warcraftlogs_poll"
+    )
+
+
+async def on_config_reloaded(session: aiohttp.ClientSession, state: StateStore, old, new):
+    """Recompile the sources and update the poll schedule for ones that were added, removed or edited."""
+    setup_v2_client(session, new)
+    compiled = compile_log_sources(new)
+    added, removed, changed = reload_sources(
+        _sources, _schedules, compiled, old['log_sources'], new['log_sources'], new
+    )
+    if not (added or removed or changed):
+        return
+
+    for name in removed:
+        _validators.pop(name, None)
+    for name in changed:
+        if old['log_sources'][name]['url'] != new['log_sources'][name]['url']:
+            _validators.pop(name, None)
+
+    await state.migrate_id_files(compiled[name].state_key for name in added | changed)
+    log.info("Warcraft Logs sources reloaded: added %s, removed %s, changed %s", sorted(added), sorted(removed), sorted(changed))
+
+
+async def run_checks_once(dispatcher: MessageDispatcher, session: aiohttp.ClientSession, state: StateStore):
+    await poll_sources(dispatcher, session, state, list(_sources))
+
+
+@profiled_job("warcraftlogs_poll")
+async def poll_due_sources(dispatcher: MessageDispatcher, session: aiohttp.ClientSession, state: StateStore):
+    due = collect_due(_schedules, budget=request_budget(adaptive_settings(get_config())))
+    if not due:
+        return
+    await poll_sources(dispatcher, session, state, due)
+
+
+async def poll_sources(dispatcher: MessageDispatcher, session: aiohttp.ClientSession, state: StateStore, source_names):
+    semaphore = asyncio.Semaphore(get_config().get("log_check_concurrency", 5))
+    sources = [_sources[name] for name in source_names if name in _sources]
 
-    except aiohttp.ClientError as e:
-        print(f"HTTP request error: {e}")
+    async def sem_fetch(source):
+        async with semaphore, profile_span(f"warcraftlogs:{source.name}"):
+            validators = _validators.setdefault(source.name, ResponseValidators())
+            return await fetch_new_logs(session, state, source, validators)
+
+    # Everything v2 can express goes into one batched GraphQL query, the rest is fetched from v1 per source
+    v2_sources = [source for source in sources if source.v2_filter] if _v2_client else []
+    v1_sources = [source for source in sources if source not in v2_sources]
+
+    v2_results, v1_results = await asyncio.gather(
+        fetch_new_logs_v2(state, v2_sources),
+        asyncio.gather(*(sem_fetch(source) for source in v1_sources)),
+    )
+
+    for source, new_logs in zip(v1_sources, v1_results):
+        _record_activity(source.name, bool(new_logs))
+    for source in v2_sources:
+        _record_activity(source.name, source in v2_results)
+
+    announcements = [
+        announce_and_commit(dispatcher, state, source, new_logs, _validators[source.name])
+        for source, new_logs in zip(v1_sources, v1_results)
+        if new_logs
+    ]
+    announcements += [
+        announce_and_commit(dispatcher, state, source, new_logs, None)
+        for source, new_logs in v2_results.items()
+    ]
+    if announcements:
+        await asyncio.gather(*announcements)
+
+
+def _record_activity(name, active):
+    schedule = _schedules.get(name)
+    if schedule is not None:
+        schedule.record_activity(active)
+
+
+async def announce_and_commit(dispatcher, state, source, logs, validators):
+    try:
+        await announce_new_logs(dispatcher, state, source, logs)
     except Exception as e:
-        print(f"Error occurred: {e}")
+        log.error("Failed to announce logs: %s", e, extra={"source": source.name})
+        return
+    if validators is not None:
+        validators.commit()
 
 
-async def announce_new_logs(bot, log, logs_id, filename, color, log_source_name, channels):
-    title = log['title']
-    owner = log['owner']
-    starttimeformatted = f"<t:{str(log['start'])[:-3]}:R>"
-    endtimeformatted = f"<t:{str(log['end'])[:-3]}:R>"
-    link = LOGS_BASE_URL + logs_id
+async def fetch_new_logs_v2(state, sources):
+    """Fetch every source with one GraphQL query and return ``{source: [unannounced reports, oldest first]}``."""
+    if not sources:
+        return {}
+    try:
+        async with profile_span("warcraftlogs:v2-batch"):
+            with FETCH_LATENCY.labels("warcraftlogs_v2", "batch").time():
+                reports = await _v2_client.recent_reports({source.name: source.v2_filter for source in sources})
+    except CircuitOpenError:
+        return {}
+    except (aiohttp.ClientError, UpstreamError, WarcraftLogsApiError) as e:
+        log.warning("Warcraft Logs v2 request error: %s", e)
+        ERRORS.labels("warcraftlogs").inc()
+        return {}
+
+    new_logs = {}
+    for source in sources:
+        source_new_logs = await select_new_reports(state, source, reports.get(source.name, ()))
+        if source_new_logs:
+            new_logs[source] = source_new_logs
+    return new_logs
+
 
-    embed = create_log_embed(title, owner, starttimeformatted, endtimeformatted, link, color, log_source_name)
+async def select_new_reports(state, source, reports):
+    """Diff a fetched report list against what was already announced and return the new reports, oldest first.
+
+    The ``start`` time of the newest announced report is kept as a high-water mark. Only reports
+    starting after it are candidates, and those are checked against the announced IDs. That way
+    several uploads between two polls are all announced, and a deleted newest report can't make
+    an older one look new again. Without a high-water mark (first run of a source) it is taken
+    from the newest already announced report in the list, or only the newest report is announced.
+    """
+    high_water_mark = await state.get_cursor(source.state_key)
+    if high_water_mark is not None:
+        candidates = [report for report in reports if report['start'] > high_water_mark]
+        if not candidates:
+            return []
+        unseen = set(await state.unseen(source.state_key, [report['id'] for report in candidates]))
+        new_reports = [report for report in candidates if report['id'] in unseen]
+    else:
+        unseen = set(await state.unseen(source.state_key, [report['id'] for report in reports]))
+        announced = [report for report in reports if report['id'] not in unseen]
+        if announced:
+            newest_announced = max(report['start'] for report in announced)
+            await state.set_cursor(source.state_key, newest_announced)
+            new_reports = [
+                report for report in reports if report['id'] in unseen and report['start'] > newest_announced
+            ]
+        else:
+            new_reports = [max(reports, key=lambda report: report['start'])] if reports else []
+
+    new_reports.sort(key=lambda report: report['start'])
+    if not new_reports:
+        log.info("Latest logs have already been announced", extra={"source": source.name, "repeat": True})
+    return new_reports
+
+
+async def fetch_new_logs(session, state, source, validators):
+    """Return the reports of a source that haven't been announced yet, oldest first."""
+    try:
+        with FETCH_LATENCY.labels("warcraftlogs", source.name).time():
+            body = await fetch_if_changed(session, source.url, validators)
+        if body is None:
+            return []
+        new_logs = await select_new_reports(state, source, json.loads(body))
+        if new_logs:
+            return new_logs
+        validators.commit()
 
-    for channel_id in channels:
-        await bot.rest.create_message(channel_id, embed)
+    except CircuitOpenError:
+        # the breaker already reported the outage, skip quietly until it recovers
+        pass
+    except (aiohttp.ClientError, UpstreamError) as e:
+        log.warning("HTTP request error: %s", e, extra={"source": source.name})
+        ERRORS.labels("warcraftlogs").inc()
+    except Exception:
+        log.exception("Error while checking logs", extra={"source": source.name})
+        ERRORS.labels("warcraftlogs").inc()
+    return []
 
-    previous_logs_ids = []
-    if os.path.exists(filename):
-        with open(filename, "r") as f:
-            previous_logs_ids = f.read().splitlines()
 
-    previous_logs_ids.append(logs_id)
-    with open(filename, "w") as f:
-        f.writelines("\n".join(previous_logs_ids[-5:]))
+async def announce_new_logs(dispatcher, state, source, logs):
+    # all new reports of a source go out together, packed into as few messages per channel as possible
+    delivered = await dispatcher.deliver(source.channels, [create_log_embed(source, log) for log in logs])
+    state.mark_seen(source.state_key, [log['id'] for log, ok in zip(logs, delivered) if ok])
+    ANNOUNCEMENTS.labels("log", source.name).inc(sum(delivered))
+    if not all(delivered):
+        raise RuntimeError(f"{delivered.count(False)} report(s) could not be delivered to every channel")
+    await state.set_cursor(source.state_key, max(log['start'] for log in logs))
 
 
-def create_log_embed(title, owner, starttimeformatted, endtimeformatted, link, color, log_source_name):
-    embed = hikari.Embed(title=f"{log_source_name} has uploaded new Warcraft Logs", color=color)
+def create_log_embed(source, log):
+    embed = hikari.Embed(title=source.embed_title, color=source.color)
     embed.set_thumbnail(THUMBNAIL_URL)
-    embed.add_field(name="Title:", value=title, inline=True)
-    embed.add_field(name="Author:", value=owner, inline=True)
-    embed.add_field(name="Log source:", value=log_source_name, inline=True)
-    embed.add_field(name="Start time:", value=starttimeformatted, inline=True)
-    embed.add_field(name="End time:", value=endtimeformatted, inline=True)
+    embed.add_field(name="Title:", value=log['title'], inline=True)
+    embed.add_field(name="Author:", value=log['owner'], inline=True)
+    embed.add_field(name="Log source:", value=source.name, inline=True)
+    embed.add_field(name="Start time:", value=f"<t:{log['start'] // 1000}:R>", inline=True)
+    embed.add_field(name="End time:", value=f"<t:{log['end'] // 1000}:R>", inline=True)
     embed.add_field(name="‎", value="‎", inline=True)
-    embed.add_field(name="Link:", value=link, inline=False)
+    embed.add_field(name="Link:", value=LOGS_BASE_URL + log['id'], inline=False)
     return embed
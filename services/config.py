@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+import os
+from types import MappingProxyType
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import jsonschema
+
+log = logging.getLogger(__name__)
+
+CONFIG_PATH = "config.json"
+SCHEMA_PATH = "config.schema.json"
+# How often config.json is checked for changes
+WATCH_INTERVAL_SECONDS = 10
+
+
+class ConfigError(Exception):
+    pass
+
+
+def freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def diff_sections(old, new) -> tuple[set, set, set]:
+    """Compare two mappings of named sources and return the (added, removed, changed) names."""
+    old = old or {}
+    new = new or {}
+    added = new.keys() - old.keys()
+    removed = old.keys() - new.keys()
+    changed = {name for name in old.keys() & new.keys() if old[name] != new[name]}
+    return set(added), set(removed), changed
+
+
+def check_timezone(config: dict) -> None:
+    """Reject an ``adaptive_polling`` time zone that the schema accepts as a string but ZoneInfo can't load."""
+    name = (config.get("adaptive_polling") or {}).get("timezone")
+    if name is None:
+        return
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ConfigError(f"adaptive_polling/timezone: unknown time zone {name!r}") from e
+
+
+class ConfigService:
+    """Holds config.json as one parsed, schema-validated, immutable snapshot.
+
+    The file is parsed once, and :meth:`check_for_changes` (run periodically by the scheduler)
+    swaps in a new snapshot when its mtime changes. Readers always see either the old or the
+    new snapshot as a whole. A file that fails to parse or validate is rejected and the current
+    snapshot stays active. Subscribers are called with ``(old, new)`` after every swap so they
+    can reschedule just the sources that changed.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH, schema_path: str = SCHEMA_PATH):
+        self.path = path
+        self.schema_path = schema_path
+        self._snapshot = None
+        self._mtime = None
+        self._validator = None
+        self._subscribers = []
+
+    @property
+    def snapshot(self):
+        if self._snapshot is None:
+            self._mtime = os.stat(self.path).st_mtime_ns
+            self._snapshot = self._load()
+        return self._snapshot
+
+    def subscribe(self, callback) -> None:
+        """Register ``async callback(old, new)`` to be awaited after a reload."""
+        self._subscribers.append(callback)
+
+    def _load(self):
+        if self._validator is None:
+            with open(self.schema_path, "r", encoding="utf-8") as f:
+                self._validator = jsonschema.Draft7Validator(json.load(f))
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ConfigError(f"{self.path} is not valid JSON: {e}") from e
+        errors = sorted(self._validator.iter_errors(config), key=lambda e: list(e.path))
+        if errors:
+            details = "; ".join(f"{'/'.join(map(str, e.path)) or '<root>'}: {e.message}" for e in errors[:5])
+            raise ConfigError(f"{self.path} does not match {self.schema_path}: {details}")
+        check_timezone(config)
+        return freeze(config)
+
+    async def check_for_changes(self) -> bool:
+        """Reload the snapshot if the file changed on disk. Returns whether a new snapshot was swapped in."""
+        try:
+            mtime = (await asyncio.to_thread(os.stat, self.path)).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+
+        try:
+            new = await asyncio.to_thread(self._load)
+        except ConfigError as e:
+            log.error("Config reload rejected, keeping the current config: %s", e)
+            return False
+
+        old, self._snapshot = self._snapshot, new
+        log.info("Reloaded %s", self.path)
+        for callback in self._subscribers:
+            try:
+                await callback(old, new)
+            except Exception:
+                log.exception("Config reload handler %s failed", getattr(callback, '__qualname__', callback))
+        return True
+
+
+config_service = ConfigService()
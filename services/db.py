@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+DB_PATH = "data/bot.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS announced (
+    source TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    announced_at REAL NOT NULL,
+    PRIMARY KEY (source, item_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS announced_by_time ON announced (source, announced_at);
+
+CREATE TABLE IF NOT EXISTS rank_snapshots (
+    group_name TEXT NOT NULL,
+    guild_key TEXT NOT NULL,
+    mythic_world_rank TEXT NOT NULL,
+    heroic_world_rank TEXT NOT NULL,
+    normal_world_rank TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (group_name, guild_key)
+) WITHOUT ROWID;
+
+-- append-only samples, clustered by guild and time so a trend is one range scan; NULL means unranked
+CREATE TABLE IF NOT EXISTS rank_history (
+    group_name TEXT NOT NULL,
+    guild_key TEXT NOT NULL,
+    sampled_at INTEGER NOT NULL,
+    mythic_rank INTEGER,
+    heroic_rank INTEGER,
+    normal_rank INTEGER,
+    progress_score INTEGER NOT NULL,
+    PRIMARY KEY (group_name, guild_key, sampled_at)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS leaderboard_messages (
+    group_name TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    content_hash TEXT,
+    PRIMARY KEY (group_name, channel_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cursors (
+    source TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at REAL NOT NULL
+);
+"""
+
+
+class Database:
+    """One SQLite connection in WAL mode, used only from a dedicated worker thread.
+
+    Every query is shipped to that thread with :meth:`run`, so callers on the event loop
+    never block on disk and the connection never has to be shared between threads.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._conn = conn
+
+    async def open(self) -> None:
+        if self._conn is None:
+            await self.run(lambda: self._connect())
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self.run(lambda: self._conn.close())
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` on the database thread and return its result."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def fetchall(self, sql: str, params=()) -> list[tuple]:
+        return await self.run(lambda: self._conn.execute(sql, params).fetchall())
+
+    async def executemany(self, sql: str, rows) -> None:
+        def _write():
+            with self._conn:
+                self._conn.executemany(sql, rows)
+
+        await self.run(_write)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The raw connection, for functions passed to :meth:`run`."""
+        return self._conn
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import hikari
+
+from services.metrics import DISCORD_REST_LATENCY, ERRORS
+
+log = logging.getLogger(__name__)
+
+# Discord limits for a single message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+def embed_length(embed: hikari.Embed) -> int:
+    """Number of characters Discord counts towards the per-message embed limit."""
+    length = len(embed.title or "") + len(embed.description or "")
+    length += sum(len(field.name) + len(field.value) for field in embed.fields)
+    if embed.footer and embed.footer.text:
+        length += len(embed.footer.text)
+    if embed.author and embed.author.name:
+        length += len(embed.author.name)
+    return length
+
+
+class MessageDispatcher:
+    """Sends bot announcements through one queue per Discord channel.
+
+    Each channel is drained by its own worker, so different channels are sent to in parallel
+    while messages within a channel keep their order. Embeds queued for the same channel are
+    packed up to 10 per message. Per-route rate limits are handled by hikari's REST client;
+    because every channel is its own route, a slow or limited channel doesn't hold up the others.
+    """
+
+    def __init__(self, rest: hikari.api.RESTClient):
+        self._rest = rest
+        self._queues: dict[int, deque] = {}
+        self._wakeups: dict[int, asyncio.Event] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+
+    def send(self, channel_id: int, embed: hikari.Embed) -> asyncio.Future:
+        """Queue one embed for a channel. The returned future resolves once it has been delivered."""
+        future = asyncio.get_running_loop().create_future()
+        if channel_id not in self._workers:
+            self._queues[channel_id] = deque()
+            self._wakeups[channel_id] = asyncio.Event()
+            self._workers[channel_id] = asyncio.create_task(self._run(channel_id))
+        self._queues[channel_id].append((embed, future))
+        self._wakeups[channel_id].set()
+        return future
+
+    async def deliver(self, channel_ids, embeds) -> list[bool]:
+        """Send every embed to every channel and wait. Returns, per embed, whether all channels received it."""
+        per_channel = [[self.send(channel_id, embed) for embed in embeds] for channel_id in channel_ids]
+        await asyncio.gather(*(f for futures in per_channel for f in futures), return_exceptions=True)
+        return [
+            all(not futures[i].exception() for futures in per_channel)
+            for i in range(len(embeds))
+        ]
+
+    async def close(self, timeout: float = 10) -> None:
+        """Give queued messages up to ``timeout`` seconds to go out, then stop the workers."""
+        pending = [future for queue in self._queues.values() for _, future in queue]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+
+    def _next_batch(self, queue: deque) -> list:
+        batch = [queue.popleft()]
+        size = embed_length(batch[0][0])
+        while queue and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            next_size = embed_length(queue[0][0])
+            if size + next_size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append(queue.popleft())
+            size += next_size
+        return batch
+
+    async def _run(self, channel_id: int) -> None:
+        queue = self._queues[channel_id]
+        wakeup = self._wakeups[channel_id]
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            while queue:
+                batch = self._next_batch(queue)
+                start = time.perf_counter()
+                try:
+                    await self._rest.create_message(channel_id, embeds=[embed for embed, _ in batch])
+                except Exception as e:
+                    log.error("Failed to send %d embed(s): %s", len(batch), e, extra={"channel_id": channel_id})
+                    ERRORS.labels("discord").inc()
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                finally:
+                    DISCORD_REST_LATENCY.labels("create_message").observe(time.perf_counter() - start)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
@@ -0,0 +1,89 @@
+import hashlib
+from urllib.parse import urlparse
+
+import aiohttp
+
+from services.resilience import call_with_retry, raise_for_retryable
+
+# Connection pool tuning shared by every outbound HTTP poller.
+TOTAL_CONNECTION_LIMIT = 100
+PER_HOST_CONNECTION_LIMIT = 10
+DNS_CACHE_TTL = 300  # seconds
+KEEPALIVE_TIMEOUT = 75  # seconds, longer than the 1 minute poll interval
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """Create the bot-wide pooled HTTP session. Must be called from inside the running event loop."""
+    connector = aiohttp.TCPConnector(
+        limit=TOTAL_CONNECTION_LIMIT,
+        limit_per_host=PER_HOST_CONNECTION_LIMIT,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT)
+
+
+async def close_http_session(session: aiohttp.ClientSession) -> None:
+    if not session.closed:
+        await session.close()
+
+
+class ResponseValidators:
+    """Cache validators remembered from the last fully processed response of one polled resource.
+
+    Validators from a new response are only staged; the caller commits them once the body has been
+    handled, so a failed announcement is retried on the next poll instead of being skipped as unchanged.
+    """
+
+    __slots__ = ("etag", "last_modified", "digest", "_pending")
+
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self._pending = None
+
+    def request_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def commit(self) -> None:
+        if self._pending is not None:
+            self.etag, self.last_modified, self.digest = self._pending
+            self._pending = None
+
+
+async def fetch_if_changed(session: aiohttp.ClientSession, url: str, validators: ResponseValidators) -> bytes | None:
+    """GET ``url`` conditionally and return the body, or None when it hasn't changed since the last commit.
+
+    ETag/Last-Modified are sent when the server provided them before, and a 304 skips reading the body.
+    Servers without validators fall back to comparing a hash of the raw bytes, so the caller can
+    still skip JSON decoding when nothing changed. The request goes through the host's circuit breaker.
+    """
+    host = urlparse(url).hostname
+
+    async def get():
+        async with session.get(url, headers=validators.request_headers()) as response:
+            if response.status == 304:
+                return None
+            raise_for_retryable(host, response)
+            response.raise_for_status()
+            return await response.read(), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    fetched = await call_with_retry(host, get)
+    if fetched is None:
+        return None
+    body, etag, last_modified = fetched
+
+    digest = hashlib.blake2b(body, digest_size=16).digest()
+    validators._pending = (etag, last_modified, digest)
+    if digest == validators.digest:
+        validators.commit()
+        return None
+    return body
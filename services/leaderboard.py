@@ -0,0 +1,51 @@
+import hashlib
+import json
+from bisect import bisect_left, insort
+
+
+class Leaderboard:
+    """Rows kept in sort order and updated one at a time.
+
+    ``sort_key(row)`` decides the order; ties are broken by the row's key so the order is stable.
+    Changing one row is a bisect removal and insertion instead of re-sorting every row.
+    """
+
+    def __init__(self, sort_key):
+        self._sort_key = sort_key
+        self._order: list[tuple] = []
+        self._rows: dict[str, object] = {}
+
+    def __contains__(self, key) -> bool:
+        return key in self._rows
+
+    def keys(self):
+        return self._rows.keys()
+
+    def update(self, key: str, row) -> bool:
+        """Insert or replace the row for ``key``. Returns whether anything changed."""
+        old = self._rows.get(key)
+        if old is not None:
+            if old == row:
+                return False
+            self._discard(key, old)
+        self._rows[key] = row
+        insort(self._order, (self._sort_key(row), key))
+        return True
+
+    def remove(self, key: str) -> None:
+        row = self._rows.pop(key, None)
+        if row is not None:
+            self._discard(key, row)
+
+    def _discard(self, key: str, row) -> None:
+        entry = (self._sort_key(row), key)
+        del self._order[bisect_left(self._order, entry)]
+
+    def top(self, n: int) -> list:
+        return [self._rows[key] for _, key in self._order[:n]]
+
+
+def content_hash(*parts) -> str:
+    """Stable digest of JSON-serializable rendered content, to tell whether a message would change."""
+    payload = json.dumps(parts, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
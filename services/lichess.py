@@ -0,0 +1,96 @@
+from urllib.parse import quote
+
+import aiohttp
+
+from services.cache import TTLCache
+from services.resilience import LICHESS_HOST, UpstreamError, call_with_retry, raise_for_retryable
+
+LICHESS_API_URL = "https://lichess.org/api"
+USER_CACHE_TTL_SECONDS = 300
+USER_CACHE_SIZE = 512
+# Maximum number of IDs accepted by POST /api/users
+BULK_USERS_LIMIT = 300
+# /rating answers an interaction, so only retry once and never wait long
+RETRY_ATTEMPTS = 2
+MAX_RETRY_DELAY_SECONDS = 1.0
+
+
+class LichessApiError(Exception):
+    pass
+
+
+class LichessClient:
+    """Non-blocking Lichess API client on the bot's shared HTTP session.
+
+    User lookups are cached by lowercase username, and users that don't exist are cached too,
+    so repeated ``/rating`` calls don't go back to Lichess at all. Requests go through the Lichess
+    circuit breaker; an outage is raised as :class:`LichessApiError`.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self._session = session
+        self._users = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+    async def get_user(self, username: str) -> dict | None:
+        """Return the public profile of ``username``, or None if there is no such user."""
+        key = username.lower()
+        if key in self._users:
+            return self._users.get(key)
+
+        async def get():
+            async with self._session.get(f"{LICHESS_API_URL}/user/{quote(username)}") as response:
+                if response.status == 404:
+                    return None
+                raise_for_retryable(LICHESS_HOST, response)
+                if response.status != 200:
+                    raise LichessApiError(f"Lichess returned HTTP {response.status} for user {username}")
+                return await response.json()
+
+        user = await self._call(get)
+        self._users.set(key, user)
+        return user
+
+    async def get_users(self, usernames) -> dict[str, dict | None]:
+        """Look up many users at once, keyed by lowercase username. Unknown users map to None.
+
+        Cache misses are fetched with Lichess's bulk ``POST /api/users`` endpoint, one request
+        per 300 names instead of one request per player.
+        """
+        result = {}
+        missing = []
+        for username in usernames:
+            key = username.lower()
+            if key in result:
+                continue
+            if key in self._users:
+                result[key] = self._users.get(key)
+            else:
+                result[key] = None
+                missing.append(key)
+
+        for i in range(0, len(missing), BULK_USERS_LIMIT):
+            chunk = missing[i:i + BULK_USERS_LIMIT]
+
+            async def post():
+                async with self._session.post(f"{LICHESS_API_URL}/users", data=",".join(chunk)) as response:
+                    raise_for_retryable(LICHESS_HOST, response)
+                    if response.status != 200:
+                        raise LichessApiError(f"Lichess returned HTTP {response.status} for a bulk user lookup")
+                    return await response.json()
+
+            users = await self._call(post)
+            # users that don't exist are simply left out of the response
+            for user in users:
+                result[user["id"]] = user
+            for key in chunk:
+                self._users.set(key, result[key])
+
+        return result
+
+    async def _call(self, operation):
+        try:
+            return await call_with_retry(
+                LICHESS_HOST, operation, attempts=RETRY_ATTEMPTS, max_delay=MAX_RETRY_DELAY_SECONDS
+            )
+        except (aiohttp.ClientError, UpstreamError) as e:
+            raise LichessApiError(str(e)) from e
@@ -0,0 +1,118 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+DEFAULT_LEVEL = "INFO"
+# Identical INFO/DEBUG messages marked as repetitive are let through at most once per this many seconds
+DEFAULT_REPEAT_INTERVAL_SECONDS = 300
+# Record attributes that are passed through as structured fields when a call sets them with ``extra``
+STRUCTURED_FIELDS = ("source", "channel_id", "host")
+
+_listener: logging.handlers.QueueListener | None = None
+_configured_levels: set[str] = set()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the structured fields set through ``extra``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RepeatFilter(logging.Filter):
+    """Drop repetitive INFO and DEBUG records that repeat within ``interval`` seconds.
+
+    Only records logged with ``extra={"repeat": True}``, like the "nothing new" lines of every poll,
+    are filtered. They count as repeats when they come from the same logger with the same message
+    template and source, and show up once per interval. The next record that gets through carries
+    the number it stood in for as ``suppressed``. Warnings and errors are never filtered.
+    """
+
+    def __init__(self, interval: float = DEFAULT_REPEAT_INTERVAL_SECONDS):
+        super().__init__()
+        self.interval = interval
+        self._last: dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.interval <= 0 or not getattr(record, "repeat", False):
+            return True
+        key = (record.name, record.msg, getattr(record, "source", None))
+        now = time.monotonic()
+        seen = self._last.get(key)
+        if seen is not None and now - seen[0] < self.interval:
+            seen[1] += 1
+            return False
+        record.suppressed = seen[1] if seen else 0
+        self._last[key] = [now, 0]
+        return True
+
+
+def setup_logging(config) -> None:
+    """Route all logging through a queue so the event loop never waits on stdout.
+
+    Records are put on an unbounded queue by a ``QueueHandler`` on the root logger and written by a
+    ``QueueListener`` thread, as JSON lines or plain text depending on ``logging.format``.
+    """
+    global _listener
+    settings = config.get("logging", {})
+    output = logging.StreamHandler(sys.stdout)
+    if settings.get("format", "json") == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    handler.addFilter(RepeatFilter(settings.get("repeat_interval_seconds", DEFAULT_REPEAT_INTERVAL_SECONDS)))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    apply_levels(config)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def apply_levels(config) -> None:
+    """Set the root level and the per-module levels from ``logging.level`` and ``logging.levels``."""
+    settings = config.get("logging", {})
+    logging.getLogger().setLevel(settings.get("level", DEFAULT_LEVEL))
+    levels = settings.get("levels", {})
+    # modules dropped from the config go back to inheriting the root level
+    for name in _configured_levels - levels.keys():
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+    _configured_levels.clear()
+    _configured_levels.update(levels)
+
+
+async def on_config_reloaded(old, new) -> None:
+    if old.get("logging") != new.get("logging"):
+        apply_levels(new)
+
+
+def stop_logging() -> None:
+    """Flush whatever is still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+from aiohttp import web
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9108
+# How often the event loop lag is sampled
+LOOP_LAG_INTERVAL_SECONDS = 1.0
+
+FETCH_LATENCY = Histogram(
+    "bot_fetch_seconds", "Time spent fetching one source from an external API, retries included",
+    ["api", "source"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+API_REQUESTS = Counter(
+    "bot_api_requests_total", "External API calls by host and outcome (ok, retry, error, circuit_open)",
+    ["host", "outcome"],
+)
+CIRCUIT_OPEN = Gauge("bot_circuit_open", "1 while the circuit breaker of a host is open", ["host"])
+DISCORD_REST_LATENCY = Histogram(
+    "bot_discord_rest_seconds", "Latency of Discord REST calls made by the bot", ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+JOB_DURATION = Histogram(
+    "bot_job_seconds", "Run time of scheduled jobs", ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120),
+)
+JOB_MISFIRES = Counter("bot_job_misfires_total", "Scheduled job runs that were missed", ["job"])
+ANNOUNCEMENTS = Counter("bot_announcements_total", "Items announced to Discord", ["kind", "source"])
+ERRORS = Counter("bot_errors_total", "Errors by component", ["component"])
+EVENT_LOOP_LAG = Gauge("bot_event_loop_lag_seconds", "How late the last event loop lag probe woke up")
+
+
+def instrument_scheduler(sched) -> None:
+    """Record duration, errors and misfires of every APScheduler job."""
+    started = {}
+
+    def listener(event):
+        if event.code == EVENT_JOB_SUBMITTED:
+            started[event.job_id] = time.perf_counter()
+        elif event.code == EVENT_JOB_MISSED:
+            JOB_MISFIRES.labels(event.job_id).inc()
+        else:
+            start = started.pop(event.job_id, None)
+            if start is not None:
+                JOB_DURATION.labels(event.job_id).observe(time.perf_counter() - start)
+            if event.code == EVENT_JOB_ERROR:
+                ERRORS.labels(f"job:{event.job_id}").inc()
+
+    sched.add_listener(listener, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+
+
+async def monitor_event_loop_lag(interval: float = LOOP_LAG_INTERVAL_SECONDS) -> None:
+    """Sleep for ``interval`` over and over and report how much later than that the loop woke us up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - start - interval))
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+async def start_metrics_server(host: str = DEFAULT_METRICS_HOST, port: int = DEFAULT_METRICS_PORT) -> web.AppRunner:
+    """Serve the default Prometheus registry on ``http://host:port/metrics`` from the bot's event loop."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError:
+        await runner.cleanup()
+        raise
+    return runner
+
+
+async def stop_metrics_server(runner: web.AppRunner) -> None:
+    await runner.cleanup()
@@ -0,0 +1,220 @@
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from apscheduler.triggers.cron import CronTrigger
+
+from services.config import diff_sections
+from services.ratelimit import TokenBucket
+
+# How often the coalesced poll job wakes up to look for due sources
+POLL_TICK_SECONDS = 60
+# The tick job never runs exactly on time, so a source counts as due if its next run is less than
+# half a tick away; otherwise a tick a few milliseconds early would push it back a whole tick
+DUE_TOLERANCE = timedelta(seconds=POLL_TICK_SECONDS / 2)
+
+DEFAULT_ADAPTIVE_POLLING = {
+    "enabled": False,
+    "min_interval_seconds": 60,
+    "max_interval_seconds": 1800,
+    "backoff_factor": 2.0,
+    # keep polling at the fastest rate for this long after a source had something new
+    "active_period_seconds": 3600,
+    "raid_windows": [],
+    "timezone": "UTC",
+    # shared by every adaptive poller and charged per source poll: a Reddit poll costs 2 (submissions
+    # and comments), a Warcraft Logs poll 1, also when the v2 API batches several sources into one query
+    "requests_per_minute": 60,
+}
+
+_WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+_budget: TokenBucket | None = None
+_budget_rate: float | None = None
+_settings_cache = (object(), None)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SourceSchedule:
+    """Tracks when a single source is next due, based on its crontab expression.
+
+    Sources no longer get an APScheduler job each; one tick job asks every schedule
+    whether it is due and polls those sources together.
+    """
+
+    __slots__ = ("cron_schedule", "trigger", "next_run")
+
+    def __init__(self, cron_schedule: str, now: datetime | None = None):
+        self.cron_schedule = cron_schedule
+        self.trigger = CronTrigger.from_crontab(cron_schedule)
+        self.next_run = None
+        self.advance(now or utcnow())
+
+    def is_due(self, now: datetime) -> bool:
+        return self.next_run is not None and self.next_run <= now + DUE_TOLERANCE
+
+    def advance(self, now: datetime) -> None:
+        # an early tick must not fire the same cron time twice
+        after = max(now, self.next_run) if self.next_run is not None else now
+        self.next_run = self.trigger.get_next_fire_time(None, after + timedelta(microseconds=1))
+
+    def record_activity(self, active: bool, now: datetime | None = None) -> None:
+        """Fixed cron schedules don't react to activity."""
+
+
+class AdaptiveSchedule:
+    """Polls a source often while it is active and backs off exponentially while it is idle.
+
+    The source's crontab expression sets its fastest interval (``*/5`` never polls more than
+    every five minutes). The schedule stays at that interval during a configured raid window and
+    for ``active_period_seconds`` after the source last had something new. Every idle poll outside
+    those periods multiplies the interval by ``backoff_factor``, up to ``max_interval_seconds``.
+    """
+
+    __slots__ = ("cron_schedule", "settings", "min_interval", "interval", "last_activity", "next_run")
+
+    def __init__(self, cron_schedule: str, settings: dict, now: datetime | None = None):
+        now = now or utcnow()
+        trigger = CronTrigger.from_crontab(cron_schedule)
+        first = trigger.get_next_fire_time(None, now)
+        second = trigger.get_next_fire_time(first, first + timedelta(microseconds=1))
+        self.cron_schedule = cron_schedule
+        self.settings = settings
+        self.min_interval = max(settings["min_interval_seconds"], (second - first).total_seconds())
+        self.interval = self.min_interval
+        self.last_activity = None
+        self.next_run = now + timedelta(seconds=self.min_interval)
+
+    def is_due(self, now: datetime) -> bool:
+        return self.next_run <= now + DUE_TOLERANCE
+
+    def is_hot(self, now: datetime) -> bool:
+        if self.last_activity and (now - self.last_activity).total_seconds() < self.settings["active_period_seconds"]:
+            return True
+        return in_raid_window(self.settings, now)
+
+    def advance(self, now: datetime) -> None:
+        interval = self.min_interval if self.is_hot(now) else self.interval
+        self.next_run = now + timedelta(seconds=interval)
+
+    def record_activity(self, active: bool, now: datetime | None = None) -> None:
+        now = now or utcnow()
+        if active:
+            self.last_activity = now
+            self.interval = self.min_interval
+            self.next_run = min(self.next_run, now + timedelta(seconds=self.min_interval))
+        elif not self.is_hot(now):
+            self.interval = min(self.settings["max_interval_seconds"], self.interval * self.settings["backoff_factor"])
+
+
+def adaptive_settings(config) -> dict | None:
+    """Return the resolved ``adaptive_polling`` settings, or None when adaptive polling is off.
+
+    Config snapshots are immutable, so the result is cached until a reload brings a different section.
+    An unchanged section keeps returning the same object, which tells schedules built from it apart.
+    """
+    global _settings_cache
+    section = config.get("adaptive_polling")
+    if _settings_cache[0] == section:
+        return _settings_cache[1]
+    settings = _resolve_adaptive_settings(section or {})
+    _settings_cache = (section, settings)
+    return settings
+
+
+def _resolve_adaptive_settings(section) -> dict | None:
+    settings = {**DEFAULT_ADAPTIVE_POLLING, **section}
+    if not settings["enabled"]:
+        return None
+    windows = []
+    for window in settings["raid_windows"]:
+        days = {_WEEKDAYS[day[:3].lower()] for day in window["days"]}
+        start = time.fromisoformat(window["start"])
+        end = time.fromisoformat(window["end"])
+        windows.append((days, start, end))
+    settings["raid_windows"] = windows
+    settings["timezone"] = ZoneInfo(settings["timezone"])
+    return settings
+
+
+def in_raid_window(settings: dict, now: datetime) -> bool:
+    local = now.astimezone(settings["timezone"])
+    for days, start, end in settings["raid_windows"]:
+        if start <= end:
+            if local.weekday() in days and start <= local.time() < end:
+                return True
+        # windows past midnight belong to the day they started on
+        elif (local.weekday() in days and local.time() >= start) or \
+                ((local.weekday() - 1) % 7 in days and local.time() < end):
+            return True
+    return False
+
+
+def make_schedule(cron_schedule: str, settings: dict | None):
+    if settings is None:
+        return SourceSchedule(cron_schedule)
+    return AdaptiveSchedule(cron_schedule, settings)
+
+
+def rebuild_schedules(sources: dict, schedules: dict, config) -> None:
+    """Recreate every source's schedule, e.g. when adaptive polling is switched on or retuned."""
+    settings = adaptive_settings(config)
+    schedules.clear()
+    for name, source in sources.items():
+        schedules[name] = make_schedule(source.cron_schedule, settings)
+
+
+def reload_sources(sources: dict, schedules: dict, compiled: dict, old_section, new_section, config):
+    """Swap freshly ``compiled`` sources into ``sources`` and bring the poll ``schedules`` up to date.
+
+    Sources whose cron expression is unchanged keep their schedule, and with it their adaptive
+    backoff state. Returns the (added, removed, changed) source names.
+    """
+    added, removed, changed = diff_sections(old_section, new_section)
+    # channel_ids may have changed as well, so every descriptor is swapped in
+    sources.clear()
+    sources.update(compiled)
+    settings = adaptive_settings(config)
+    if any(getattr(schedule, "settings", None) is not settings for schedule in schedules.values()):
+        rebuild_schedules(sources, schedules, config)
+        return added, removed, changed
+
+    for name in removed:
+        schedules.pop(name, None)
+    for name in added | changed:
+        cron_schedule = compiled[name].cron_schedule
+        if name not in schedules or schedules[name].cron_schedule != cron_schedule:
+            schedules[name] = make_schedule(cron_schedule, settings)
+    return added, removed, changed
+
+
+def request_budget(settings: dict | None) -> TokenBucket | None:
+    """The request budget shared by all adaptive pollers, or None when adaptive polling is off."""
+    global _budget, _budget_rate
+    if settings is None:
+        return None
+    rate = settings["requests_per_minute"] / 60
+    if _budget is None or rate != _budget_rate:
+        _budget = TokenBucket(rate, settings["requests_per_minute"])
+        _budget_rate = rate
+    return _budget
+
+
+def collect_due(
+        schedules: dict, now: datetime | None = None, budget: TokenBucket | None = None, cost: float = 1
+) -> list[str]:
+    """Return the names of due sources and move each of them on to its next run.
+
+    With a budget, every source poll takes ``cost`` tokens, the most overdue sources go first,
+    and sources that don't fit in the budget stay due for the next tick.
+    """
+    now = now or utcnow()
+    due = [name for name, schedule in schedules.items() if schedule.is_due(now)]
+    if budget is not None:
+        due.sort(key=lambda name: schedules[name].next_run)
+        due = [name for name in due if budget.try_acquire(cost)]
+    for name in due:
+        schedules[name].advance(now)
+    return due
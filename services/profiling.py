@@ -0,0 +1,167 @@
+import contextvars
+import cProfile
+import functools
+import heapq
+import io
+import pstats
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from utils import get_config
+
+# Slowest runs kept per job
+SLOWEST_RUNS_KEPT = 5
+# Functions listed in a stored cProfile summary
+PROFILE_LINES = 15
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("profiling_span", default=None)
+_stats: dict[str, "JobStats"] = {}
+_profiler_busy = False
+
+
+class Span:
+    """One timed run of a job (or of one source inside a job)."""
+
+    __slots__ = ("name", "parent", "started_at", "wall", "network", "cpu", "profile")
+
+    def __init__(self, name: str, parent: "Span | None"):
+        self.name = name
+        self.parent = parent
+        self.started_at = time.time()
+        self.wall = 0.0
+        self.network = 0.0
+        self.cpu = 0.0
+        self.profile = None
+
+
+class JobStats:
+    __slots__ = ("name", "runs", "errors", "total_wall", "total_network", "total_cpu", "slowest")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.runs = 0
+        self.errors = 0
+        self.total_wall = 0.0
+        self.total_network = 0.0
+        self.total_cpu = 0.0
+        # min-heap of (wall, started_at, span), so the fastest of the kept runs is dropped first
+        self.slowest = []
+
+    @property
+    def max_wall(self) -> float:
+        return max((wall for wall, _, _ in self.slowest), default=0.0)
+
+    @property
+    def avg_wall(self) -> float:
+        return self.total_wall / self.runs if self.runs else 0.0
+
+    def record(self, span: Span, failed: bool) -> None:
+        self.runs += 1
+        self.errors += failed
+        self.total_wall += span.wall
+        self.total_network += span.network
+        self.total_cpu += span.cpu
+        entry = (span.wall, span.started_at, span)
+        if len(self.slowest) < SLOWEST_RUNS_KEPT:
+            heapq.heappush(self.slowest, entry)
+        elif span.wall > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def slowest_runs(self) -> list[Span]:
+        return [span for _, _, span in sorted(self.slowest, key=lambda entry: entry[0], reverse=True)]
+
+
+def _settings() -> dict:
+    return get_config().get("profiling", {})
+
+
+def profiling_enabled() -> bool:
+    return _settings().get("enabled", False)
+
+
+@asynccontextmanager
+async def profile_span(name: str):
+    """Time the body as a run of ``name`` when profiling is enabled; otherwise do nothing.
+
+    Wall time is measured directly. Network time is what :func:`network_call` blocks report while
+    this span is the current one, so concurrently running spans don't see each other's requests.
+    CPU time is the process CPU used while the span was open; when other tasks run at the same time
+    it includes their work as well, so it is an upper bound.
+    """
+    if not profiling_enabled():
+        yield None
+        return
+    global _profiler_busy
+    settings = _settings()
+    span = Span(name, _current_span.get())
+    token = _current_span.set(span)
+    # cProfile sees every task on the thread, so only top-level job runs are sampled, one at a time
+    profiler = None
+    if (
+            span.parent is None and not _profiler_busy and settings.get("cprofile", False)
+            and random.random() < settings.get("cprofile_sample_rate", 0.1)
+    ):
+        _profiler_busy = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    failed = True
+    try:
+        yield span
+        failed = False
+    finally:
+        span.wall = time.perf_counter() - wall_start
+        span.cpu = time.process_time() - cpu_start
+        _current_span.reset(token)
+        if profiler is not None:
+            profiler.disable()
+            _profiler_busy = False
+            stats = _stats.get(name)
+            if stats is None or len(stats.slowest) < SLOWEST_RUNS_KEPT or span.wall > stats.slowest[0][0]:
+                span.profile = _summarize(profiler)
+        _stats.setdefault(name, JobStats(name)).record(span, failed)
+
+
+def _summarize(profiler: cProfile.Profile) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+
+@contextmanager
+def network_call():
+    """Count the time spent in the body as network time of the current span and its parents.
+
+    A parent whose sources fetch concurrently gets the sum of their request times, which can be
+    more than its wall time; the ratio shows how much the concurrency is saving.
+    """
+    span = _current_span.get()
+    if span is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        while span is not None:
+            span.network += elapsed
+            span = span.parent
+
+
+def profiled_job(name: str):
+    """Decorate a scheduled coroutine function so that each run is recorded under ``name``."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with profile_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def slowest_jobs(top_n: int) -> list[JobStats]:
+    """Jobs and sources ordered by their slowest recorded run."""
+    return sorted(_stats.values(), key=lambda stats: stats.max_wall, reverse=True)[:top_n]
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlencode
+
+import aiohttp
+
+from services.metrics import FETCH_LATENCY
+from services.ratelimit import AdaptiveLimiter, TokenBucket
+from services.resilience import RAIDERIO_HOST, CircuitOpenError, UpstreamError, call_with_retry, raise_for_retryable
+
+log = logging.getLogger(__name__)
+
+RAIDERIO_API_URL = "https://raider.io/api/v1"
+# Raider.IO allows 1000 requests per minute with an access key and 300 without
+REQUESTS_PER_MINUTE_WITH_KEY = 1000
+REQUESTS_PER_MINUTE_WITHOUT_KEY = 300
+
+
+def _header_number(headers, *names) -> float | None:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+def profile_key(region: str, realm: str, name: str) -> tuple[str, str, str]:
+    """Raider.IO looks guilds up case-insensitively, so requests are deduplicated on the folded names."""
+    return region.casefold(), realm.casefold(), name.casefold()
+
+
+class RaiderIOClient:
+    """Raider.IO API client on the bot's shared HTTP session.
+
+    Requests are paced by a token bucket sized for the API's per-minute budget and run under an
+    :class:`AdaptiveLimiter`. The limiter starts at the configured concurrency limit, backs off when
+    Raider.IO answers 429 or reports little remaining budget, and grows back as requests succeed.
+    Concurrent requests for the same guild and fields share one request.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, access_key: str, concurrency_limit: int = 5):
+        self._session = session
+        self._access_key = access_key
+        per_minute = REQUESTS_PER_MINUTE_WITH_KEY if access_key else REQUESTS_PER_MINUTE_WITHOUT_KEY
+        self.bucket = TokenBucket(per_minute / 60, concurrency_limit)
+        self.limiter = AdaptiveLimiter(concurrency_limit)
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._waiters: dict[tuple, int] = {}
+
+    def set_concurrency_limit(self, concurrency_limit: int) -> None:
+        self.limiter.max_limit = concurrency_limit
+        self.limiter.limit = min(self.limiter.limit, float(concurrency_limit))
+
+    def _observe(self, headers) -> None:
+        remaining = _header_number(headers, "RateLimit-Remaining", "X-RateLimit-Remaining")
+        reset = _header_number(headers, "RateLimit-Reset", "X-RateLimit-Reset")
+        if reset is not None and reset > 1e9:  # an epoch timestamp rather than seconds to go
+            reset -= time.time()
+        self.bucket.observe(remaining, reset)
+        self.limiter.observe(remaining)
+
+    async def guild_profile(self, region: str, realm: str, name: str, fields: str) -> dict | None:
+        """Return a guild's profile with the given ``fields``, or None if Raider.IO doesn't know the guild."""
+        key = (*profile_key(region, realm, name), fields)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_guild_profile(region, realm, name, fields))
+            self._inflight[key] = task
+            self._waiters[key] = 0
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                # the last caller is done or gave up; a request nobody waits for anymore is cancelled
+                del self._inflight[key], self._waiters[key]
+                task.cancel()
+
+    async def _fetch_guild_profile(self, region: str, realm: str, name: str, fields: str) -> dict | None:
+        params = {"region": region, "realm": realm, "name": name, "fields": fields}
+        if self._access_key:
+            params["access_key"] = self._access_key
+        url = f"{RAIDERIO_API_URL}/guilds/profile?{urlencode(params)}"
+
+        async def get():
+            async with self.limiter:
+                await self.bucket.acquire()
+                async with self._session.get(url) as response:
+                    self._observe(response.headers)
+                    if response.status == 429:
+                        self.limiter.throttled()
+                    raise_for_retryable(RAIDERIO_HOST, response)
+                    if response.status in (400, 404):
+                        # Raider.IO answers 400 for guilds it can't find
+                        log.warning("Raider.IO has no guild %s-%s/%s (HTTP %d)", region, realm, name, response.status)
+                        return None
+                    response.raise_for_status()
+                    data = await response.json()
+                self.limiter.succeeded()
+                return data
+
+        with FETCH_LATENCY.labels("raiderio", name).time():
+            return await call_with_retry(RAIDERIO_HOST, get)
+
+    async def guild_profiles(self, guilds, fields: str, deadline: float) -> dict[tuple, dict]:
+        """Fetch many guilds concurrently and return what arrived within ``deadline`` seconds.
+
+        The result is keyed by :func:`profile_key`, and a guild listed more than once is fetched once.
+        Guilds that failed or that Raider.IO doesn't know are left out, and so are guilds that were
+        still waiting when the deadline passed; their requests are cancelled.
+        """
+        unique = {profile_key(g["region"], g["realm"], g["name"]): g for g in guilds}
+        tasks = {
+            asyncio.create_task(self.guild_profile(g["region"], g["realm"], g["name"], fields)): key
+            for key, g in unique.items()
+        }
+        if not tasks:
+            return {}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            log.warning("Raider.IO fetch hit its %ss deadline with %d guild(s) still pending", deadline, len(pending))
+
+        results = {}
+        for task in done:
+            key = tasks[task]
+            error = task.exception()
+            if error is None:
+                if task.result() is not None:
+                    results[key] = task.result()
+            elif isinstance(error, CircuitOpenError):
+                continue  # already reported by the breaker
+            elif isinstance(error, (aiohttp.ClientError, UpstreamError)):
+                log.warning("Raider.IO fetch for %s failed: %s", key[2], error)
+            else:
+                log.error("Raider.IO fetch for %s failed", key[2], exc_info=error)
+        return results
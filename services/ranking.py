@@ -0,0 +1,95 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# Stand-in for a missing world rank; sorts after every real one
+NO_RANK = 999999
+EMPTY_RANKS = {"mythic_world_rank": "N/A", "heroic_world_rank": "N/A", "normal_world_rank": "N/A", "summary": "N/A"}
+FAILED_RANKS = {**EMPTY_RANKS, "summary": "Failed to fetch"}
+
+_SUMMARY = re.compile(r"\s*(?:(\d+)/\d+\s+)?([MHN])\s*", re.IGNORECASE)
+_DIFFICULTY_BASE = {"M": 3000, "H": 2000, "N": 1000}
+# bit widths of the packed sort key: a progress score below 4096 and three ranks below 2**20
+_RANK_BITS = 20
+_SCORE_LIMIT = 1 << 12
+
+
+class GuildRank(NamedTuple):
+    """One guild's standing in a raid. Ranks are ints with :data:`NO_RANK` for none."""
+    key: str
+    name: str
+    region: str
+    realm: str
+    mythic: int
+    heroic: int
+    normal: int
+    summary: str
+    score: int
+    sort_key: int
+
+    def best_rank(self) -> tuple[str, int] | None:
+        """The hardest difficulty the guild has a world rank on, and that rank."""
+        for label, rank in (("Mythic", self.mythic), ("Heroic", self.heroic), ("Normal", self.normal)):
+            if rank < NO_RANK:
+                return label, rank
+        return None
+
+
+def parse_rank(rank_str) -> int:
+    try:
+        rank = int(rank_str)
+        return rank if 0 < rank < NO_RANK else NO_RANK
+    except (ValueError, TypeError):
+        return NO_RANK
+
+
+@lru_cache(maxsize=256)
+def progress_score(summary: str) -> int:
+    """Score a summary like ``"3/8 M"`` so that more kills on a higher difficulty sort first.
+
+    A tier only has a few dozen distinct summaries, so each one is parsed once and then cached.
+    """
+    match = _SUMMARY.fullmatch(summary) if isinstance(summary, str) else None
+    if match is None:
+        return 0
+    killed, difficulty = match.groups()
+    return _DIFFICULTY_BASE[difficulty.upper()] + int(killed or 0)
+
+
+def pack_sort_key(score: int, mythic: int, heroic: int, normal: int) -> int:
+    """One int that orders like ``(-score, mythic, heroic, normal)``.
+
+    Highest progress first, then the best world rank from the hardest difficulty down.
+    """
+    key = _SCORE_LIMIT - 1 - min(score, _SCORE_LIMIT - 1)
+    for rank in (mythic, heroic, normal):
+        key = (key << _RANK_BITS) | rank
+    return key
+
+
+def parse_profile(profile: dict, raid_slug: str) -> dict:
+    """Pick the world ranks and progress summary of ``raid_slug`` out of a Raider.IO guild profile."""
+    raid_data = (profile.get("raid_progression") or {}).get(raid_slug)
+    if not raid_data:
+        return EMPTY_RANKS
+    rank_info = (profile.get("raid_rankings") or {}).get(raid_slug, {})
+    return {
+        "mythic_world_rank": str(rank_info.get("mythic", {}).get("world", "N/A")),
+        "heroic_world_rank": str(rank_info.get("heroic", {}).get("world", "N/A")),
+        "normal_world_rank": str(rank_info.get("normal", {}).get("world", "N/A")),
+        "summary": raid_data.get("summary", "N/A"),
+    }
+
+
+def guild_rank(key: str, guild: dict, ranks: dict | None) -> GuildRank:
+    """Build a record from a configured guild and its parsed ranks; None means the fetch failed."""
+    if ranks is None:
+        ranks = FAILED_RANKS
+    mythic = parse_rank(ranks["mythic_world_rank"])
+    heroic = parse_rank(ranks["heroic_world_rank"])
+    normal = parse_rank(ranks["normal_world_rank"])
+    score = progress_score(ranks["summary"])
+    return GuildRank(
+        key, guild["name"], guild["region"], guild["realm"], mythic, heroic, normal, ranks["summary"], score,
+        pack_sort_key(score, mythic, heroic, normal),
+    )
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second refill up to ``capacity``.
+
+    :meth:`observe` lets a caller feed back the budget an API reports in its rate-limit
+    headers, so the bucket slows down before the server starts rejecting requests.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.base_rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1) -> None:
+        async with self._lock:  # waiters are served first come, first served
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take ``tokens`` if they are available right now, without waiting."""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def observe(self, remaining: float | None, seconds_to_reset: float | None = None) -> None:
+        """Clamp the bucket to the server-reported remaining budget and spread it over the reset window."""
+        if remaining is None:
+            return
+        self._refill()
+        self._tokens = min(self._tokens, max(0.0, remaining))
+        if seconds_to_reset and seconds_to_reset > 0:
+            self.rate = min(self.base_rate, max(remaining, 1) / seconds_to_reset)
+        else:
+            self.rate = self.base_rate
+
+
+class AdaptiveLimiter:
+    """Async concurrency limit that adapts to how the server is coping (AIMD).
+
+    Used as ``async with limiter:``. Every success raises the limit by roughly one per round of
+    requests, up to ``max_limit``; :meth:`throttled` halves it. :meth:`observe` clamps it to the
+    budget a server reports as remaining, so requests already queued don't all hit a 429.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def succeeded(self) -> None:
+        self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def throttled(self) -> None:
+        self.limit = max(float(self.min_limit), self.limit / 2)
+
+    def observe(self, remaining: float | None) -> None:
+        if remaining is not None and remaining < self.limit:
+            self.limit = max(float(self.min_limit), float(remaining))
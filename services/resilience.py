@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from services.metrics import API_REQUESTS, CIRCUIT_OPEN
+from services.profiling import network_call
+
+log = logging.getLogger(__name__)
+
+# Consecutive failures after which a host's circuit opens
+FAILURE_THRESHOLD = 5
+# How long an open circuit first stays open; doubled every time the probe after it fails
+RESET_TIMEOUT_SECONDS = 60
+MAX_RESET_TIMEOUT_SECONDS = 900
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY_SECONDS = 1.0
+# Longer waits aren't slept through inside a poll; the circuit stays open for them instead
+MAX_RETRY_DELAY_SECONDS = 30.0
+
+WARCRAFT_LOGS_HOST = "www.warcraftlogs.com"
+RAIDERIO_HOST = "raider.io"
+REDDIT_HOST = "oauth.reddit.com"
+LICHESS_HOST = "lichess.org"
+
+
+class UpstreamError(Exception):
+    """An external API is failing or has asked us to back off."""
+
+
+class RetryableStatus(UpstreamError):
+    def __init__(self, host: str, status: int, retry_after: float | None = None):
+        super().__init__(f"{host} returned HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} is failing, skipping requests for another {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+
+    After ``FAILURE_THRESHOLD`` consecutive failures, or a ``Retry-After`` from the server, the
+    circuit opens and calls fail immediately with :class:`CircuitOpenError` instead of reaching
+    the host. Once the open period ends a single probe request is let through: if it succeeds the
+    circuit closes, otherwise it reopens for twice as long.
+    """
+
+    __slots__ = ("host", "failures", "open_until", "reset_timeout", "probing")
+
+    def __init__(self, host: str):
+        self.host = host
+        self.failures = 0
+        self.open_until = 0.0
+        self.reset_timeout = RESET_TIMEOUT_SECONDS
+        self.probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.open_until > 0
+
+    def retry_in(self) -> float:
+        return max(0.0, self.open_until - time.monotonic())
+
+    def allow(self) -> bool:
+        if not self.is_open:
+            return True
+        if self.probing or time.monotonic() < self.open_until:
+            return False
+        self.probing = True
+        return True
+
+    def record_success(self) -> None:
+        if self.is_open:
+            log.info("Circuit closed again", extra={"host": self.host})
+            CIRCUIT_OPEN.labels(self.host).set(0)
+        self.failures = 0
+        self.open_until = 0.0
+        self.reset_timeout = RESET_TIMEOUT_SECONDS
+        self.probing = False
+
+    def record_failure(self, retry_after: float | None = None) -> None:
+        self.failures += 1
+        if self.probing:
+            self.probing = False
+            self.reset_timeout = min(MAX_RESET_TIMEOUT_SECONDS, self.reset_timeout * 2)
+            self._open(max(self.reset_timeout, retry_after or 0))
+        elif self.failures >= FAILURE_THRESHOLD:
+            self._open(max(self.reset_timeout, retry_after or 0))
+        elif retry_after:
+            self._open(retry_after)
+
+    def _open(self, seconds: float) -> None:
+        if not self.is_open:
+            log.warning("Circuit opened for %.0fs after %d failure(s)", seconds, self.failures, extra={"host": self.host})
+            CIRCUIT_OPEN.labels(self.host).set(1)
+        self.open_until = time.monotonic() + seconds
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(host)
+    return breaker
+
+
+def parse_retry_after(value) -> float | None:
+    """Seconds to wait according to a ``Retry-After`` value, which is either delta-seconds or an HTTP date."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def raise_for_retryable(host: str, response: aiohttp.ClientResponse) -> None:
+    """Raise :class:`RetryableStatus` for a 429 or 5xx response."""
+    if response.status == 429 or response.status >= 500:
+        raise RetryableStatus(host, response.status, parse_retry_after(response.headers.get("Retry-After")))
+
+
+def is_permanent(error: BaseException) -> bool:
+    """A 4xx other than 429 won't go away by retrying, and it means the host itself is up."""
+    return isinstance(error, aiohttp.ClientResponseError) and error.status < 500 and error.status != 429
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff, so many pollers failing together don't retry in lockstep."""
+    return random.uniform(0, min(MAX_RETRY_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+
+
+async def call_with_retry(
+        host: str,
+        operation,
+        attempts: int = RETRY_ATTEMPTS,
+        retry_on: tuple = (aiohttp.ClientError, asyncio.TimeoutError, RetryableStatus),
+        max_delay: float = MAX_RETRY_DELAY_SECONDS,
+):
+    """Await ``operation()`` behind the circuit breaker of ``host``, retrying transient failures.
+
+    Exceptions in ``retry_on`` are retried with jittered backoff, or after the server's
+    ``Retry-After`` if it sent one. A wait longer than ``max_delay`` is not slept through: the last
+    error is raised and the circuit stays open until then. A call that fails after all its attempts
+    counts as one failure for the breaker. Permanent 4xx answers and any other exception mean the
+    host did answer, so they are re-raised right away without touching the breaker.
+    """
+    breaker = breaker_for(host)
+    for attempt in range(attempts):
+        if not breaker.allow():
+            API_REQUESTS.labels(host, "circuit_open").inc()
+            raise CircuitOpenError(host, breaker.retry_in())
+        try:
+            with network_call():
+                result = await operation()
+        except retry_on as e:
+            if is_permanent(e):
+                API_REQUESTS.labels(host, "error").inc()
+                breaker.probing = False
+                raise
+            API_REQUESTS.labels(host, "retry").inc()
+            retry_after = parse_retry_after(getattr(e, "retry_after", None))
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            # a failed probe isn't retried; the breaker decides when the next one goes out
+            if (breaker.probing or attempt == attempts - 1 or delay > max_delay
+                    or breaker.is_open and breaker.retry_in() > delay):
+                breaker.record_failure(retry_after)
+                raise
+            await asyncio.sleep(delay)
+        except BaseException:
+            API_REQUESTS.labels(host, "error").inc()
+            breaker.probing = False
+            raise
+        else:
+            API_REQUESTS.labels(host, "ok").inc()
+            breaker.record_success()
+            return result
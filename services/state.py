@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from services.db import Database
+
+log = logging.getLogger(__name__)
+
+# How often buffered announcements are written to the database
+FLUSH_INTERVAL_SECONDS = 5
+# Rank history older than the first value is thinned out to one sample per the second value (seconds)
+RANK_HISTORY_TIERS = ((7 * 86400, 3600), (30 * 86400, 86400))
+# SQLite's default limit on bound parameters is 999; stay well below it
+_LOOKUP_CHUNK = 500
+
+
+def _read_ids(path: str) -> list[str]:
+    with open(path, "r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class StateStore:
+    """Announcement dedup state and rank snapshots for every tracker, backed by SQLite.
+
+    Sources are keyed by the file name they used to be stored in (``logs/<filename>``,
+    ``reddit/<user>.txt``) so existing config keeps working. Newly announced IDs are buffered
+    in memory and written in one transaction by :meth:`flush`; lookups check that buffer first
+    and then hit the ``(source, item_id)`` primary key index.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._pending: dict[str, dict[str, float]] = {}
+        self._flush_lock = asyncio.Lock()
+
+    async def unseen(self, key: str, item_ids) -> list[str]:
+        """Return the IDs from ``item_ids`` that haven't been announced for ``key``, in their original order."""
+        pending = self._pending.get(key, {})
+        candidates = [item_id for item_id in item_ids if item_id not in pending]
+        seen = set()
+        for i in range(0, len(candidates), _LOOKUP_CHUNK):
+            chunk = candidates[i:i + _LOOKUP_CHUNK]
+            rows = await self.db.fetchall(
+                f"SELECT item_id FROM announced WHERE source = ? AND item_id IN ({','.join('?' * len(chunk))})",
+                (key, *chunk),
+            )
+            seen.update(row[0] for row in rows)
+        return [item_id for item_id in candidates if item_id not in seen]
+
+    def mark_seen(self, key: str, item_ids) -> None:
+        now = time.time()
+        pending = self._pending.setdefault(key, {})
+        for item_id in item_ids:
+            pending[item_id] = now
+
+    async def flush(self) -> None:
+        """Write every buffered announcement to the database."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            rows = [(key, item_id, ts) for key, ids in pending.items() for item_id, ts in ids.items()]
+            try:
+                await self.db.executemany(
+                    "INSERT OR IGNORE INTO announced (source, item_id, announced_at) VALUES (?, ?, ?)", rows
+                )
+            except Exception as e:
+                log.error("Failed to save announced IDs: %s", e)
+                for key, ids in pending.items():
+                    self._pending.setdefault(key, {}).update(ids)
+
+    async def get_cursor(self, key: str) -> float | None:
+        """Return the high-water mark stored for ``key`` (e.g. the newest announced timestamp), if any."""
+        rows = await self.db.fetchall("SELECT value FROM cursors WHERE source = ?", (key,))
+        return rows[0][0] if rows else None
+
+    async def set_cursor(self, key: str, value: float) -> None:
+        await self.db.executemany("INSERT OR REPLACE INTO cursors (source, value) VALUES (?, ?)", [(key, value)])
+
+    async def get_rank_snapshots(self, group_name: str) -> dict[str, dict]:
+        rows = await self.db.fetchall(
+            "SELECT guild_key, mythic_world_rank, heroic_world_rank, normal_world_rank, summary "
+            "FROM rank_snapshots WHERE group_name = ?",
+            (group_name,),
+        )
+        return {
+            key: {"mythic_world_rank": mythic, "heroic_world_rank": heroic, "normal_world_rank": normal, "summary": summary}
+            for key, mythic, heroic, normal, summary in rows
+        }
+
+    async def save_rank_snapshots(self, group_name: str, snapshots: dict[str, dict]) -> None:
+        now = time.time()
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO rank_snapshots "
+            "(group_name, guild_key, mythic_world_rank, heroic_world_rank, normal_world_rank, summary, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (group_name, key, s["mythic_world_rank"], s["heroic_world_rank"], s["normal_world_rank"], s["summary"], now)
+                for key, s in snapshots.items()
+            ],
+        )
+
+    async def append_rank_history(self, group_name: str, samples, sampled_at: float | None = None) -> None:
+        """Append ``(guild_key, mythic, heroic, normal, progress_score)`` samples taken at ``sampled_at``."""
+        ts = int(sampled_at if sampled_at is not None else time.time())
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO rank_history "
+            "(group_name, guild_key, sampled_at, mythic_rank, heroic_rank, normal_rank, progress_score) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(group_name, key, ts, mythic, heroic, normal, score) for key, mythic, heroic, normal, score in samples],
+        )
+
+    async def rank_history(self, group_name: str, guild_key: str, since: float, points: int) -> list[tuple]:
+        """Return up to ``points`` ``(sampled_at, mythic, heroic, normal, progress_score)`` rows since ``since``.
+
+        The range is cut into ``points`` equal buckets and the newest sample of each is returned, oldest first.
+        """
+        since = int(since)
+        bucket = max(1, (int(time.time()) - since) // points + 1)
+        # SQLite takes the bare columns from the row that holds MAX(sampled_at)
+        return await self.db.fetchall(
+            "SELECT MAX(sampled_at), mythic_rank, heroic_rank, normal_rank, progress_score FROM rank_history "
+            "WHERE group_name = ? AND guild_key = ? AND sampled_at >= ? "
+            "GROUP BY (sampled_at - ?) / ? ORDER BY 1",
+            (group_name, guild_key, since, since, bucket),
+        )
+
+    async def compact_rank_history(self, now: float | None = None) -> int:
+        """Downsample old rank history per :data:`RANK_HISTORY_TIERS`. Returns the number of rows removed."""
+        return await self.db.run(self._compact_rank_history, int(now if now is not None else time.time()))
+
+    async def get_leaderboard_messages(self, group_name: str) -> dict[int, tuple[int, str | None]]:
+        """Return ``channel_id -> (message_id, content_hash)`` of the leaderboard messages a group posted."""
+        rows = await self.db.fetchall(
+            "SELECT channel_id, message_id, content_hash FROM leaderboard_messages WHERE group_name = ?",
+            (group_name,),
+        )
+        return {channel_id: (message_id, content_hash) for channel_id, message_id, content_hash in rows}
+
+    async def save_leaderboard_message(
+            self, group_name: str, channel_id: int, message_id: int, content_hash: str | None
+    ) -> None:
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO leaderboard_messages (group_name, channel_id, message_id, content_hash) "
+            "VALUES (?, ?, ?, ?)",
+            [(group_name, channel_id, message_id, content_hash)],
+        )
+
+    async def migrate_message_id_file(self, group_name: str, channel_id: int, path: str) -> None:
+        """One-shot import of an old ``{"message_id": ...}`` file of a leaderboard channel."""
+        await self.db.run(self._migrate_message_id_file, group_name, channel_id, path)
+
+    async def migrate_id_files(self, keys) -> None:
+        """One-shot import of the old ``*.txt`` seen-ID files. Each file is imported at most once."""
+        await asyncio.gather(*(self.db.run(self._migrate_id_file, key) for key in keys))
+
+    async def migrate_rank_file(self, group_name: str, path: str) -> None:
+        """One-shot import of the old ``guild_ranks_grouped.json`` snapshot file."""
+        await self.db.run(self._migrate_rank_file, group_name, path)
+
+    # The _migrate_* helpers run on the database thread
+
+    def _applied(self, name: str) -> bool:
+        conn = self.db.connection
+        return conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone() is not None
+
+    def _migrate_id_file(self, key: str) -> None:
+        name = f"ids:{key}"
+        if self._applied(name) or not os.path.exists(key):
+            return
+        ids = _read_ids(key)
+        now = time.time()
+        conn = self.db.connection
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO announced (source, item_id, announced_at) VALUES (?, ?, ?)",
+                # keep the file order so the newest ID also gets the newest timestamp
+                [(key, item_id, now + i * 1e-6) for i, item_id in enumerate(ids)],
+            )
+            conn.execute("INSERT INTO migrations (name, applied_at) VALUES (?, ?)", (name, now))
+        log.info("Migrated %d announced IDs from %s", len(ids), key)
+
+    def _migrate_rank_file(self, group_name: str, path: str) -> None:
+        name = f"ranks:{group_name}:{path}"
+        if self._applied(name) or not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            snapshots = json.load(f)
+        now = time.time()
+        conn = self.db.connection
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO rank_snapshots "
+                "(group_name, guild_key, mythic_world_rank, heroic_world_rank, normal_world_rank, summary, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        group_name, key,
+                        s.get("mythic_world_rank", "N/A"), s.get("heroic_world_rank", "N/A"),
+                        s.get("normal_world_rank", "N/A"), s.get("summary", "N/A"), now,
+                    )
+                    for key, s in snapshots.items()
+                ],
+            )
+            conn.execute("INSERT INTO migrations (name, applied_at) VALUES (?, ?)", (name, now))
+        log.info("Migrated %d rank snapshots from %s", len(snapshots), path)
+
+    def _migrate_message_id_file(self, group_name: str, channel_id: int, path: str) -> None:
+        name = f"message:{group_name}:{path}"
+        if self._applied(name) or not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            message_id = json.load(f).get("message_id")
+        now = time.time()
+        conn = self.db.connection
+        with conn:
+            if message_id:
+                # no content hash is known, so the first check after the import edits the message once
+                conn.execute(
+                    "INSERT OR IGNORE INTO leaderboard_messages (group_name, channel_id, message_id, content_hash) "
+                    "VALUES (?, ?, ?, NULL)",
+                    (group_name, channel_id, int(message_id)),
+                )
+            conn.execute("INSERT INTO migrations (name, applied_at) VALUES (?, ?)", (name, now))
+        log.info("Migrated leaderboard message ID from %s", path)
+
+    def _compact_rank_history(self, now: int) -> int:
+        def bucket_of(sampled_at):
+            # the widest bucket of any tier the sample is old enough for
+            return max(size for age, size in RANK_HISTORY_TIERS if sampled_at < now - age)
+
+        conn = self.db.connection
+        rows = conn.execute(
+            "SELECT group_name, guild_key, sampled_at FROM rank_history WHERE sampled_at < ? "
+            "ORDER BY group_name, guild_key, sampled_at",
+            (now - min(age for age, _ in RANK_HISTORY_TIERS),),
+        )
+        # walk the primary key in order and keep only the newest sample of each guild's bucket
+        doomed = []
+        previous = None
+        for row in rows:
+            if previous is not None and previous[:2] == row[:2]:
+                bucket = bucket_of(previous[2])
+                if previous[2] // bucket == row[2] // bucket:
+                    doomed.append(previous)
+            previous = row
+        with conn:
+            conn.executemany(
+                "DELETE FROM rank_history WHERE group_name = ? AND guild_key = ? AND sampled_at = ?", doomed
+            )
+        if doomed:
+            log.info("Compacted rank history, removed %d samples", len(doomed))
+        return len(doomed)
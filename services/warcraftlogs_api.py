@@ -0,0 +1,135 @@
+import functools
+import json
+import logging
+import re
+import time
+from urllib.parse import unquote, urlparse
+
+import aiohttp
+
+from services.resilience import WARCRAFT_LOGS_HOST, call_with_retry, raise_for_retryable
+
+log = logging.getLogger(__name__)
+
+TOKEN_URL = "https://www.warcraftlogs.com/oauth/token"
+GRAPHQL_URL = "https://www.warcraftlogs.com/api/v2/client"
+# Refresh the access token this long before it actually expires
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+# Reports requested per source; more than one so uploads between polls aren't missed
+REPORTS_PER_SOURCE = 5
+# Aliased report queries per GraphQL request, to stay well inside the API's query complexity limit
+MAX_ALIASES_PER_QUERY = 50
+
+_GUILD_PATH = re.compile(r"/v1/reports/guild/(?P<name>[^/]+)/(?P<server>[^/]+)/(?P<region>[^/?]+)")
+
+REPORT_FIELDS = "data { code title startTime endTime owner { name } }"
+
+
+class WarcraftLogsApiError(Exception):
+    pass
+
+
+def server_slug(server: str) -> str:
+    return re.sub(r"[^a-z0-9-]", "", server.strip().lower().replace(" ", "-"))
+
+
+def v2_report_filter(source) -> str | None:
+    """GraphQL arguments selecting the reports of a configured log source, or None if v2 can't express it.
+
+    Guild sources are derived from their v1 URL. The v2 API only accepts numeric user IDs, so
+    user sources need an explicit ``user_id`` in the config.
+    """
+    if source.get("user_id") is not None:
+        return f"userID: {int(source['user_id'])}"
+    match = _GUILD_PATH.search(urlparse(source["url"]).path)
+    if not match:
+        return None
+    return (
+        f"guildName: {json.dumps(unquote(match['name']))}, "
+        f"guildServerSlug: {json.dumps(server_slug(unquote(match['server'])))}, "
+        f"guildServerRegion: {json.dumps(unquote(match['region']).lower())}"
+    )
+
+
+def to_v1_report(report: dict) -> dict:
+    """Convert a v2 report into the v1 shape the announcer already understands."""
+    return {
+        "id": report["code"],
+        "title": report["title"],
+        "owner": (report.get("owner") or {}).get("name", "Unknown"),
+        "start": report["startTime"],
+        "end": report["endTime"],
+    }
+
+
+class WarcraftLogsV2Client:
+    """Warcraft Logs v2 GraphQL client using the OAuth client-credentials flow.
+
+    The access token is cached until shortly before it expires and refreshed once on a 401.
+    Requests go through the Warcraft Logs circuit breaker and are retried on 429/5xx.
+    :meth:`recent_reports` asks for the reports of many sources in a single query by giving
+    every source its own alias.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, client_id: str, client_secret: str):
+        self._session = session
+        self._auth = aiohttp.BasicAuth(client_id, client_secret)
+        self._token = None
+        self._token_expires_at = 0.0
+
+    async def _access_token(self, force_refresh: bool = False) -> str:
+        if not force_refresh and self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+        async with self._session.post(TOKEN_URL, data={"grant_type": "client_credentials"}, auth=self._auth) as response:
+            raise_for_retryable(WARCRAFT_LOGS_HOST, response)
+            if response.status != 200:
+                raise WarcraftLogsApiError(f"token request failed with HTTP {response.status}")
+            payload = await response.json()
+        self._token = payload["access_token"]
+        self._token_expires_at = time.monotonic() + payload.get("expires_in", 3600) - TOKEN_REFRESH_MARGIN_SECONDS
+        return self._token
+
+    async def query(self, query: str) -> dict:
+        return await call_with_retry(WARCRAFT_LOGS_HOST, functools.partial(self._query, query))
+
+    async def _query(self, query: str) -> dict:
+        for attempt in range(2):
+            token = await self._access_token(force_refresh=attempt > 0)
+            headers = {"Authorization": f"Bearer {token}"}
+            async with self._session.post(GRAPHQL_URL, json={"query": query}, headers=headers) as response:
+                if response.status == 401 and attempt == 0:
+                    continue
+                raise_for_retryable(WARCRAFT_LOGS_HOST, response)
+                if response.status != 200:
+                    raise WarcraftLogsApiError(f"GraphQL request failed with HTTP {response.status}")
+                payload = await response.json()
+            if payload.get("data") is None:
+                raise WarcraftLogsApiError(f"GraphQL query failed: {payload.get('errors')}")
+            for error in payload.get("errors") or ():
+                log.warning("Warcraft Logs GraphQL error: %s", error.get("message"))
+            return payload["data"]
+        raise WarcraftLogsApiError("access token was rejected twice")
+
+    async def recent_reports(self, filters: dict[str, str]) -> dict[str, list[dict]]:
+        """Fetch the newest reports for every ``name -> report filter`` pair, newest first, in v1 shape.
+
+        Sources whose part of the query failed are left out of the result.
+        """
+        names = list(filters)
+        results = {}
+        for i in range(0, len(names), MAX_ALIASES_PER_QUERY):
+            chunk = names[i:i + MAX_ALIASES_PER_QUERY]
+            aliases = {f"s{i + n}": name for n, name in enumerate(chunk)}
+            query = "query {\n" + "\n".join(
+                f"  {alias}: reportData {{ reports({filters[name]}, limit: {REPORTS_PER_SOURCE}) {{ {REPORT_FIELDS} }} }}"
+                for alias, name in aliases.items()
+            ) + "\n}"
+            data = await self.query(query)
+            for alias, name in aliases.items():
+                report_data = data.get(alias)
+                if not report_data or not report_data.get("reports"):
+                    continue
+                reports = [to_v1_report(report) for report in report_data["reports"]["data"]]
+                reports.sort(key=lambda report: report["start"], reverse=True)
+                results[name] = reports
+        return results
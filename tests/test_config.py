@@ -0,0 +1,51 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from services.config import SCHEMA_PATH, ConfigError, ConfigService
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), SCHEMA_PATH)
+
+
+def write_config(path, adaptive_polling):
+    config = {"channel_ids": {}, "log_sources": {}, "reddit_sources": {}, "adaptive_polling": adaptive_polling}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+
+def raid_window(**overrides):
+    return {"days": ["Wed", "thursday"], "start": "19:00", "end": "23:30", **overrides}
+
+
+def test_valid_adaptive_polling_section_loads(tmp_path):
+    path = tmp_path / "config.json"
+    write_config(path, {"enabled": True, "timezone": "Europe/Helsinki", "raid_windows": [raid_window()]})
+    snapshot = ConfigService(str(path), SCHEMA).snapshot
+    assert snapshot["adaptive_polling"]["timezone"] == "Europe/Helsinki"
+
+
+@pytest.mark.parametrize("section", [
+    {"timezone": "Europe/Helsinky"},
+    {"raid_windows": [raid_window(start="29:00")]},
+    {"raid_windows": [raid_window(end="24:00")]},
+    {"raid_windows": [raid_window(days=["Monkey"])]},
+])
+def test_bad_adaptive_polling_section_is_rejected(tmp_path, section):
+    path = tmp_path / "config.json"
+    write_config(path, section)
+    with pytest.raises(ConfigError):
+        ConfigService(str(path), SCHEMA).snapshot
+
+
+def test_rejected_reload_keeps_the_current_snapshot(tmp_path):
+    path = tmp_path / "config.json"
+    write_config(path, {"timezone": "UTC"})
+    service = ConfigService(str(path), SCHEMA)
+    current = service.snapshot
+
+    write_config(path, {"timezone": "Europe/Helsinky"})
+    os.utime(path, ns=(0, 0))
+    assert not asyncio.run(service.check_for_changes())
+    assert service.snapshot is current
@@ -0,0 +1,66 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from services.polling import (
+    POLL_TICK_SECONDS, AdaptiveSchedule, SourceSchedule, collect_due, rebuild_schedules, reload_sources,
+)
+from services.ratelimit import TokenBucket
+
+START = datetime(2024, 1, 3, 19, 0, 30, tzinfo=timezone.utc)
+SETTINGS = {
+    "min_interval_seconds": 60,
+    "max_interval_seconds": 1800,
+    "backoff_factor": 2.0,
+    "active_period_seconds": 3600,
+    # always inside a raid window, so the source should stay at its fastest interval
+    "raid_windows": [(set(range(7)), datetime.min.time(), datetime.max.time())],
+    "timezone": timezone.utc,
+}
+
+
+def jittered_ticks(count, max_jitter_ms=50):
+    rng = random.Random(1)
+    for i in range(1, count + 1):
+        yield START + timedelta(seconds=i * POLL_TICK_SECONDS, milliseconds=rng.uniform(0, max_jitter_ms))
+
+
+def test_hot_adaptive_source_polls_on_every_jittered_tick():
+    schedules = {"source": AdaptiveSchedule("*/1 * * * *", SETTINGS, now=START)}
+    polls = sum(len(collect_due(schedules, now)) for now in jittered_ticks(120))
+    assert polls == 120
+
+
+def test_cron_source_polls_once_per_fire_time_on_jittered_ticks():
+    schedules = {"source": SourceSchedule("*/2 * * * *", now=START)}
+    polls = sum(len(collect_due(schedules, now)) for now in jittered_ticks(120))
+    assert polls == 60
+
+
+def test_budget_is_charged_per_request():
+    schedules = {name: AdaptiveSchedule("*/1 * * * *", SETTINGS, now=START) for name in "abcd"}
+    budget = TokenBucket(0.001, 4)
+    due = collect_due(schedules, START + timedelta(minutes=1), budget, cost=2)
+    assert len(due) == 2
+
+
+class Source:
+    def __init__(self, cron_schedule):
+        self.cron_schedule = cron_schedule
+
+
+def test_reload_sources_keeps_unchanged_schedules_and_rebuilds_on_adaptive_change():
+    config = {"adaptive_polling": {"enabled": True}}
+    sources, schedules = {}, {}
+    rebuild_schedules(sources, schedules, config)
+    old_section = {"a": {"cron": "*/5 * * * *"}, "b": {"cron": "*/5 * * * *"}}
+    reload_sources(sources, schedules, {name: Source("*/5 * * * *") for name in old_section}, {}, old_section, config)
+    kept = schedules["a"]
+
+    new_section = {"a": old_section["a"], "c": {"cron": "*/10 * * * *"}}
+    compiled = {"a": Source("*/5 * * * *"), "c": Source("*/10 * * * *")}
+    added, removed, changed = reload_sources(sources, schedules, compiled, old_section, new_section, dict(config))
+    assert (added, removed, changed) == ({"c"}, {"b"}, set())
+    assert schedules["a"] is kept and set(schedules) == {"a", "c"} and sources is not compiled
+
+    reload_sources(sources, schedules, compiled, new_section, new_section, {})
+    assert all(isinstance(schedule, SourceSchedule) for schedule in schedules.values())
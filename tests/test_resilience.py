@@ -0,0 +1,105 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from services import resilience
+from services.resilience import (
+    FAILURE_THRESHOLD,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryableStatus,
+    breaker_for,
+    call_with_retry,
+)
+
+HOST = "upstream.test"
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    resilience._breakers.clear()
+    # retries shouldn't actually wait
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+    yield
+    resilience._breakers.clear()
+
+
+def response_error(status):
+    return aiohttp.ClientResponseError(None, (), status=status, message="test")
+
+
+def failing(error, calls):
+    async def operation():
+        calls.append(1)
+        raise error
+    return operation
+
+
+def test_breaker_opens_after_threshold_and_lets_one_probe_through():
+    breaker = CircuitBreaker(HOST)
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    breaker.open_until = 1.0  # the open period is over
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert not breaker.is_open and breaker.allow()
+
+
+def test_failed_probe_doubles_the_open_period():
+    breaker = CircuitBreaker(HOST)
+    for _ in range(FAILURE_THRESHOLD):
+        breaker.record_failure()
+    breaker.open_until = 1.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.reset_timeout == 2 * resilience.RESET_TIMEOUT_SECONDS
+    assert breaker.is_open and not breaker.allow()
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404])
+def test_permanent_4xx_is_not_retried_and_does_not_trip_the_breaker(status):
+    calls = []
+    for _ in range(FAILURE_THRESHOLD + 1):
+        with pytest.raises(aiohttp.ClientResponseError):
+            asyncio.run(call_with_retry(HOST, failing(response_error(status), calls)))
+    assert len(calls) == FAILURE_THRESHOLD + 1
+    breaker = breaker_for(HOST)
+    assert breaker.failures == 0 and not breaker.is_open
+
+
+@pytest.mark.parametrize("error", [response_error(503), response_error(429), RetryableStatus(HOST, 502)])
+def test_transient_errors_are_retried_and_count_once_per_call(error):
+    calls = []
+    with pytest.raises(type(error)):
+        asyncio.run(call_with_retry(HOST, failing(error, calls), attempts=3))
+    assert len(calls) == 3
+    assert breaker_for(HOST).failures == 1
+
+
+def test_circuit_opens_after_threshold_failed_calls():
+    calls = []
+    for _ in range(FAILURE_THRESHOLD):
+        with pytest.raises(aiohttp.ClientConnectionError):
+            asyncio.run(call_with_retry(HOST, failing(aiohttp.ClientConnectionError(), calls), attempts=2))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_with_retry(HOST, failing(aiohttp.ClientConnectionError(), calls)))
+    assert len(calls) == 2 * FAILURE_THRESHOLD
+
+
+def test_success_after_a_retry_resets_the_breaker():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RetryableStatus(HOST, 503)
+        return "ok"
+
+    assert asyncio.run(call_with_retry(HOST, flaky)) == "ok"
+    assert breaker_for(HOST).failures == 0
@@ -1,6 +1,7 @@
 import json
 from dotenv import load_dotenv
 import os
+from services.config import config_service
 
 load_dotenv()
 
@@ -18,6 +19,14 @@ def get_warcraft_logs_token():
     return os.getenv('WARCRAFT_LOGS_TOKEN', None)
 
 
+def get_warcraft_logs_client_credentials():
+    return os.getenv('WARCRAFT_LOGS_CLIENT_ID', None), os.getenv('WARCRAFT_LOGS_CLIENT_SECRET', None)
+
+
+def get_raiderio_token():
+    return os.getenv('RAIDERIO_TOKEN', '').strip()
+
+
 def read_json_file(filename):
     with open(filename, 'r') as file:
         return json.load(file)
@@ -29,6 +38,5 @@ def hex_to_int(hex_color: str) -> int:
 
 
 def get_config():
-    with open("config.json", "r", encoding="utf-8") as f:
-        config = json.load(f)
-    return config
+    # Parsed once and swapped on file change by the config service, so this is cheap to call on every tick
+    return config_service.snapshot